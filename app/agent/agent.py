@@ -3,350 +3,328 @@ SimpleAgent - Core Agent Logic
 Processes queries and determines whether to generate code or text output
 """
 
+import asyncio
+import functools
+import hashlib
+import importlib.util
+import json
+import logging
 import os
 import re
-from typing import Dict, Any, Optional
+import sys
+import time
+from contextlib import asynccontextmanager
+from types import MappingProxyType
+from typing import Dict, Any, AsyncIterator, FrozenSet, List, Optional, Tuple
 from app.config import settings
+from app.agent.llm_cache import create_cache
+from app.agent.semantic_cache import create_semantic_cache
 
+logger = logging.getLogger(__name__)
 
-class SimpleAgent:
+try:
+    from aiolimiter import AsyncLimiter
+except ImportError:  # Optional: only needed for strict requests-per-minute caps
+    AsyncLimiter = None
+
+try:
+    import orjson
+except ImportError:  # Optional: faster cache-key serialization
+    orjson = None
+
+try:
+    import ahocorasick
+except ImportError:  # Optional: single-pass automaton for the fallback-marker scan
+    ahocorasick = None
+
+# Responses are only cached when sampling is (close to) deterministic
+CACHE_MAX_TEMPERATURE = 0.3
+
+ANTHROPIC_MODEL = "claude-3-opus-20240229"
+# Preferred Gemini models, best first; the first one the API key can use is picked at startup
+GEMINI_MODELS = ("gemini-2.5-flash-lite", "gemini-2.0-flash-lite", "gemini-1.5-flash")
+
+
+def _sdk_installed(module: str) -> bool:
+    """Check whether a provider SDK can be imported, without importing it"""
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ModuleNotFoundError:
+        return False
+
+
+# Provider SDKs are optional; they are only imported when the matching API key is set
+_HAS_OPENAI = _sdk_installed("openai")
+_HAS_ANTHROPIC = _sdk_installed("anthropic")
+_HAS_GEMINI = _sdk_installed("google.generativeai")
+# HTTP/2 multiplexing for the shared provider HTTP client needs the h2 package
+_HAS_HTTP2 = _sdk_installed("h2")
+
+# Query analysis keywords. Single words are matched against the query's tokens;
+# multi-word phrases are picked out by _PHRASE_RE and matched the same way.
+_WORD_RE = re.compile(r"[a-z+#]+")
+_PHRASE_RE = re.compile(r"\b(?:write code|web app|what is|how does|tell me about|c programming|c language)\b")
+
+# Keywords that suggest code generation
+_CODE_KEYWORDS = frozenset({
+    "create", "build", "develop", "implement", "write code",
+    "application", "app", "program", "script", "function",
+    "api", "service", "website", "web app", "database",
+    "class", "module", "package", "framework"
+})
+
+# Keywords that suggest text response
+_TEXT_KEYWORDS = frozenset({
+    "explain", "what is", "how does", "describe", "tell me about",
+    "information", "definition", "concept", "theory"
+})
+
+# Checked in order; the first language with a matching keyword wins
+_LANGUAGE_KEYWORDS = {
+    "python": frozenset({"python", "py", "django", "flask", "fastapi"}),
+    "javascript": frozenset({"javascript", "js", "node", "react", "vue", "angular"}),
+    "typescript": frozenset({"typescript", "ts"}),
+    "java": frozenset({"java", "spring", "maven"}),
+    "go": frozenset({"go", "golang"}),
+    "rust": frozenset({"rust"}),
+    "cpp": frozenset({"c++", "cpp"}),
+    "c": frozenset({"c programming", "c language"})
+}
+
+_FRAMEWORKS = ("django", "flask", "fastapi", "react", "vue", "angular", "express", "spring")
+
+# Every language and framework keyword, so one set intersection finds all stack hits in a query
+_LANGUAGE_BY_KEYWORD = MappingProxyType({
+    keyword: lang for lang, keywords in _LANGUAGE_KEYWORDS.items() for keyword in keywords
+})
+_STACK_KEYWORDS = frozenset(_LANGUAGE_BY_KEYWORD).union(_FRAMEWORKS)
+
+_REQUIREMENT_KEYWORDS = (
+    (frozenset({"authentication", "login", "auth"}), "- User authentication/login functionality"),
+    (frozenset({"database", "db", "sql"}), "- Database integration"),
+    (frozenset({"api", "rest", "endpoint"}), "- API endpoints/REST API"),
+    (frozenset({"crud", "create", "read", "update", "delete"}), "- CRUD operations"),
+    (frozenset({"todo", "task"}), "- Todo/task management features"),
+    (frozenset({"web", "website", "html"}), "- Web interface/HTML pages"),
+    (frozenset({"visualization", "chart", "graph", "plot"}), "- Data visualization/charts"),
+    (frozenset({"csv", "excel", "data"}), "- Data file processing"),
+    (frozenset({"cli", "command", "terminal"}), "- Command-line interface"),
+)
+
+
+# Placeholder markers that suggest an LLM answer is only a stub
+_FALLBACK_MARKERS = ("hello, world", "todo: implement", "basic template", "placeholder", "print('hello")
+_FALLBACK_RE = re.compile("|".join(map(re.escape, _FALLBACK_MARKERS)), re.IGNORECASE)
+if ahocorasick is not None:
+    _FALLBACK_AC = ahocorasick.Automaton()
+    for _marker in _FALLBACK_MARKERS:
+        _FALLBACK_AC.add_word(_marker, _marker)
+    _FALLBACK_AC.make_automaton()
+else:
+    _FALLBACK_AC = None
+# Signs of real code alongside those markers
+_CODE_KEYWORD_RE = re.compile(r"def |class |function |const |let |var ")
+# A non-blank line that is not a # or // comment
+_CODE_LINE_RE = re.compile(r"^[^\S\n]*(?!#|//)\S.*$", re.MULTILINE)
+
+# Features the offline fallback generators look for; plain substring matches on the lowercased query
+_FEATURE_RES = MappingProxyType({
+    "api": re.compile(r"api|rest"),
+    "api_only": re.compile(r"api"),
+    "database": re.compile(r"database|db|sql"),
+    "database_only": re.compile(r"database"),
+    "sql_dependency": re.compile(r"database|sql"),
+    "data": re.compile(r"csv|data"),
+    "auth": re.compile(r"login|auth"),
+    "todo": re.compile(r"todo|task"),
+})
+
+# Codebase response parsing: FILE: markers and ``` fences, each on a line of its own
+_SECTION_RE = re.compile(r"^[ \t]*(?:FILE:(?P<path>[^\n]*)|```(?P<lang>[^\n]*))$", re.MULTILINE)
+_ALT_BLOCK_RE = re.compile(r"```(\w+)?\n(.*?)```", re.DOTALL)
+# Any fenced span, including ones _ALT_BLOCK_RE skips (```c++ blocks, inline ```cmd```); kept out of READMEs
+_FENCE_SPAN_RE = re.compile(r"```.*?```", re.DOTALL)
+
+# Put on a streaming file queue when the files sent so far are superseded by a later attempt
+_FILES_RESET = object()
+
+# File extension for a code fence's language tag
+_EXT_MAP = MappingProxyType({
+    'python': 'py', 'py': 'py',
+    'javascript': 'js', 'js': 'js',
+    'typescript': 'ts', 'ts': 'ts',
+    'html': 'html', 'css': 'css',
+    'json': 'json', 'yaml': 'yml', 'yml': 'yml',
+    'markdown': 'md', 'md': 'md'
+})
+
+
+async def _openai_deltas(stream) -> AsyncIterator[str]:
+    """Text deltas from an OpenAI chat completion stream"""
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def _gemini_deltas(response) -> AsyncIterator[str]:
+    """Text deltas from a streamed Gemini response"""
+    async for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (safety ratings, finish metadata)
+            continue
+        if text:
+            yield text
+
+
+class _CodebaseScanner:
     """
-    Main agent class that processes queries and generates appropriate outputs
+    Incremental FILE:/code fence state machine over a (possibly streamed) LLM response.
+    feed() scans complete lines and returns the (path, content) files they closed;
+    finish() flushes whatever is left at the end of the response.
     """
     
     def __init__(self):
-        """Initialize the agent with configuration"""
-        self.openai_api_key = settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
-        self.anthropic_api_key = settings.ANTHROPIC_API_KEY or os.getenv("ANTHROPIC_API_KEY")
-        self.google_api_key = settings.GOOGLE_API_KEY or os.getenv("GOOGLE_API_KEY")
-        self.model = settings.DEFAULT_MODEL
-        self.temperature = settings.DEFAULT_TEMPERATURE
-
-        print(self.google_api_key)
-        
-        # Determine which API to use (priority: OpenAI > Anthropic > Google)
-        self.use_openai = bool(self.openai_api_key)
-        self.use_anthropic = bool(self.anthropic_api_key) and not self.use_openai
-        self.use_gemini = bool(self.google_api_key) and not self.use_openai and not self.use_anthropic
-    
-    async def process_query(self, query: str) -> Dict[str, Any]:
-        """
-        Process the user query and determine the appropriate response type
-        
-        Returns:
-            Dict with 'type' ('codebase' or 'text'), 'content', and 'metadata'
-        """
-        # Analyze query to determine if code generation is appropriate
-        analysis = await self._analyze_query(query)
-        
-        if analysis["should_generate_code"] and settings.ENABLE_CODE_GENERATION:
-            # Generate codebase
-            codebase = await self._generate_codebase(query, analysis)
-            return {
-                "type": "codebase",
-                "content": codebase,
-                "metadata": {
-                    "language": analysis.get("language", "python"),
-                    "framework": analysis.get("framework"),
-                    "structure": codebase.get("structure", {})
-                }
-            }
-        else:
-            # Generate text response
-            text_response = await self._generate_text_response(query, analysis)
-            return {
-                "type": "text",
-                "content": text_response,
-                "metadata": {
-                    "reason": analysis.get("reason", "Query not suitable for code generation")
-                }
-            }
+        self.files: Dict[str, str] = {}
+        self.readme_lines: List[str] = []  # Text outside files, joined once at the end
+        # Chunks of the trailing partial line; only joined once a newline arrives
+        self._pending: List[str] = []
+        self._current_file: Optional[str] = None
+        self._file_parts: List[str] = []  # Body of the current file, scanned so far
+        self._in_code_block = False
     
-    async def _analyze_query(self, query: str) -> Dict[str, Any]:
-        """
-        Analyze the query to determine if code generation is appropriate
-        """
-        # Keywords that suggest code generation
-        code_keywords = [
-            "create", "build", "develop", "implement", "write code",
-            "application", "app", "program", "script", "function",
-            "api", "service", "website", "web app", "database",
-            "class", "module", "package", "framework"
-        ]
-        
-        # Keywords that suggest text response
-        text_keywords = [
-            "explain", "what is", "how does", "describe", "tell me about",
-            "information", "definition", "concept", "theory"
-        ]
-        
-        query_lower = query.lower()
-        code_score = sum(1 for keyword in code_keywords if keyword in query_lower)
-        text_score = sum(1 for keyword in text_keywords if keyword in query_lower)
-        
-        should_generate_code = code_score > text_score and code_score > 0
-        
-        # Detect programming language
-        language = self._detect_language(query)
-        
-        # Detect framework
-        framework = self._detect_framework(query)
-        
-        return {
-            "should_generate_code": should_generate_code,
-            "code_score": code_score,
-            "text_score": text_score,
-            "language": language,
-            "framework": framework,
-            "reason": "Code generation suitable" if should_generate_code else "Query better suited for text response"
-        }
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        line_end = chunk.rfind('\n')
+        if line_end < 0:
+            self._pending.append(chunk)
+            return []
+        self._pending.append(chunk[:line_end + 1])
+        lines = ''.join(self._pending)
+        self._pending = [chunk[line_end + 1:]]
+        return self._scan(lines)
     
-    def _detect_language(self, query: str) -> str:
-        """Detect programming language from query"""
-        query_lower = query.lower()
-        language_keywords = {
-            "python": ["python", "py", "django", "flask", "fastapi"],
-            "javascript": ["javascript", "js", "node", "react", "vue", "angular"],
-            "typescript": ["typescript", "ts"],
-            "java": ["java", "spring", "maven"],
-            "go": ["go", "golang"],
-            "rust": ["rust"],
-            "cpp": ["c++", "cpp"],
-            "c": ["c programming", "c language"]
-        }
-        
-        for lang, keywords in language_keywords.items():
-            if any(keyword in query_lower for keyword in keywords):
-                return lang
-        
-        return "python"  # Default
+    def finish(self) -> List[Tuple[str, str]]:
+        closed = self._scan(''.join(self._pending))
+        self._pending = []
+        if self._current_file:
+            # Save last file if exists
+            closed.append(self._close_file())
+        return closed
     
-    def _detect_framework(self, query: str) -> Optional[str]:
-        """Detect framework from query"""
-        query_lower = query.lower()
-        frameworks = {
-            "django": "django",
-            "flask": "flask",
-            "fastapi": "fastapi",
-            "react": "react",
-            "vue": "vue",
-            "angular": "angular",
-            "express": "express",
-            "spring": "spring"
-        }
-        
-        for keyword, framework in frameworks.items():
-            if keyword in query_lower:
-                return framework
-        
-        return None
+    def _scan(self, text: str) -> List[Tuple[str, str]]:
+        # One regex pass finds every FILE: marker and code fence in a run of complete lines;
+        # the text between them goes to the open file, the README, or nowhere (anonymous blocks)
+        closed = []
+        pos = 0
+        for match in _SECTION_RE.finditer(text):
+            self._consume(text[pos:match.start()])
+            pos = match.end()
+            
+            path = match.group('path')
+            if path is not None:
+                # FILE: marker
+                if self._current_file:
+                    closed.append(self._close_file())
+                self._current_file = path.strip()
+                self._file_parts = []
+                self._in_code_block = False
+            elif not self._in_code_block:
+                # Starting a code block
+                self._in_code_block = True
+                code_block_lang = match.group('lang').strip()
+                if self._current_file:
+                    if any(part.strip() for part in self._file_parts):
+                        # The file already has content (a README with a ```bash block, or a response
+                        # wrapped in one outer fence): keep it and drop just the fence line
+                        if text.startswith('\n', pos):
+                            pos += 1
+                    else:
+                        # The current file's code starts after the fence
+                        self._file_parts = []
+                elif code_block_lang:
+                    # Code block without FILE: marker - infer filename from the language
+                    self._current_file = f"main.{_EXT_MAP.get(code_block_lang.lower(), 'txt')}"
+                    self._file_parts = []
+            else:
+                # Ending a code block
+                self._in_code_block = False
+                if self._current_file:
+                    closed.append(self._close_file())
+        self._consume(text[pos:])
+        return closed
     
-    async def _generate_codebase(self, query: str, analysis: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Generate a codebase structure based on the query
-        """
-        if self.use_openai:
-            result = await self._generate_with_openai(query, analysis, codebase=True)
-            # Check if we got empty files or fallback code
-            if not result.get("files") or self._is_fallback_code(result):
-                print("Warning: Received empty or fallback code, generating enhanced code based on query...")
-                return await self._generate_enhanced_fallback(query, analysis, result)
-            return result
-        elif self.use_anthropic:
-            result = await self._generate_with_anthropic(query, analysis, codebase=True)
-            # Check if we got empty files or fallback code
-            if not result.get("files") or self._is_fallback_code(result):
-                print("Warning: Received empty or fallback code, generating enhanced code based on query...")
-                return await self._generate_enhanced_fallback(query, analysis, result)
-            return result
-        elif self.use_gemini:
-            result = await self._generate_with_gemini(query, analysis, codebase=True)
-            # Check if we got empty files or fallback code
-            print("I am  here")
-            if not result.get("files") or self._is_fallback_code(result):
-                print("Warning: Received empty or fallback code, generating enhanced code based on query...")
-                return await self._generate_enhanced_fallback(query, analysis, result)
-            return result
-        else:
-            # No API keys - generate enhanced fallback
-            print("Warning: No API keys configured. Generating enhanced fallback code based on query.")
-            return await self._generate_enhanced_fallback(query, analysis, None)
+    def _consume(self, text: str) -> None:
+        if self._current_file:
+            self._file_parts.append(text)
+        elif not self._in_code_block:
+            # Text outside files and code blocks might be README or documentation
+            self.readme_lines.extend(line for line in text.split('\n') if line.strip())
     
-    async def _generate_text_response(self, query: str, analysis: Dict[str, Any]) -> str:
-        """
-        Generate a text response for queries not suitable for code generation
-        """
-        if self.use_openai:
-            result = await self._generate_with_openai(query, analysis, codebase=False)
-            return result.get("content", "Unable to generate response.")
-        elif self.use_anthropic:
-            result = await self._generate_with_anthropic(query, analysis, codebase=False)
-            return result.get("content", "Unable to generate response.")
-        elif self.use_gemini:
-            result = await self._generate_with_gemini(query, analysis, codebase=False)
-            return result.get("content", "Unable to generate response.")
-        else:
-            return f"Response to query: {query}\n\nThis query is better suited for an informational response rather than code generation."
+    def _close_file(self) -> Tuple[str, str]:
+        path = self._current_file
+        self.files[path] = ''.join(self._file_parts).strip()
+        self._current_file = None
+        self._file_parts = []
+        return path, self.files[path]
+
+
+def _query_terms(query_lower: str) -> FrozenSet[str]:
+    """Tokenize a lowercased query once into its words and known multi-word phrases"""
+    words = _WORD_RE.findall(query_lower)
+    # Naive singulars so "apis" or "visualizations" still match their keyword
+    singulars = [word[:-1] for word in words if word.endswith("s")]
+    return frozenset(words).union(singulars, _PHRASE_RE.findall(query_lower))
+
+
+def _has_fallback_marker(content: str) -> bool:
+    """Whether content contains any placeholder marker, found in a single pass"""
+    if _FALLBACK_AC is not None:
+        return next(_FALLBACK_AC.iter(content.lower()), None) is not None
+    return _FALLBACK_RE.search(content) is not None
+
+
+def _is_retryable_error(error: Exception) -> bool:
+    """Transient provider failures (network, rate limit, 5xx) are worth retrying elsewhere"""
+    try:
+        import httpx
+        # Failures while iterating a response stream surface as raw httpx errors, not SDK ones
+        if isinstance(error, (httpx.TransportError, httpx.TimeoutException)):
+            return True
+    except ImportError:
+        pass
     
-    async def _generate_with_openai(self, query: str, analysis: Dict[str, Any], codebase: bool) -> Dict[str, Any]:
-        """Generate response using OpenAI API"""
-        try:
-            from openai import OpenAI
-            client = OpenAI(api_key=self.openai_api_key)
-            
-            if codebase:
-                prompt = self._build_codebase_prompt(query, analysis)
-            else:
-                prompt = self._build_text_prompt(query)
-            
-            # Use lower temperature for code generation to be more deterministic
-            temp = 0.3 if codebase else self.temperature
-            
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt(codebase)},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temp,
-                max_tokens=8000  # Allow for longer code responses
-            )
-            
-            content = response.choices[0].message.content
-            
-            # Log response for debugging (first 500 chars)
-            print(f"OpenAI response preview: {content[:500]}...")
-            
-            if codebase:
-                parsed = self._parse_codebase_response(content, analysis)
-                print(f"Parsed {len(parsed.get('files', {}))} files from response")
-                return parsed
-            else:
-                return {"content": content}
-        
-        except Exception as e:
-            print(f"OpenAI API error: {e}")
-            print(f"Error details: {type(e).__name__}")
-            if codebase:
-                print("Falling back to enhanced code generation based on query...")
-                return await self._generate_enhanced_fallback(query, analysis, None)
-            else:
-                return {"content": f"Error generating response: {str(e)}"}
+    try:
+        import openai
+        if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError,
+                              openai.RateLimitError, openai.InternalServerError)):
+            return True
+    except ImportError:
+        pass
     
-    async def _generate_with_anthropic(self, query: str, analysis: Dict[str, Any], codebase: bool) -> Dict[str, Any]:
-        """Generate response using Anthropic API"""
-        try:
-            from anthropic import Anthropic
-            client = Anthropic(api_key=self.anthropic_api_key)
-            
-            if codebase:
-                prompt = self._build_codebase_prompt(query, analysis)
-            else:
-                prompt = self._build_text_prompt(query)
-            
-            # Use lower temperature for code generation
-            temp = 0.3 if codebase else 0.7
-            
-            message = client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=8000,  # Allow for longer code responses
-                temperature=temp,
-                messages=[
-                    {"role": "user", "content": f"{self._get_system_prompt(codebase)}\n\n{prompt}"}
-                ]
-            )
-            
-            content = message.content[0].text
-            
-            # Log response for debugging (first 500 chars)
-            print(f"Anthropic response preview: {content[:500]}...")
-            
-            if codebase:
-                parsed = self._parse_codebase_response(content, analysis)
-                print(f"Parsed {len(parsed.get('files', {}))} files from response")
-                return parsed
-            else:
-                return {"content": content}
-        
-        except Exception as e:
-            print(f"Anthropic API error: {e}")
-            print(f"Error details: {type(e).__name__}")
-            if codebase:
-                print("Falling back to enhanced code generation based on query...")
-                return await self._generate_enhanced_fallback(query, analysis, None)
-            else:
-                return {"content": f"Error generating response: {str(e)}"}
+    try:
+        import anthropic
+        if isinstance(error, (anthropic.APIConnectionError, anthropic.RateLimitError)):
+            return True
+        if isinstance(error, anthropic.APIStatusError) and error.status_code >= 500:
+            return True
+    except ImportError:
+        pass
     
-    async def _generate_with_gemini(self, query: str, analysis: Dict[str, Any], codebase: bool) -> Dict[str, Any]:
-        """Generate response using Google Gemini API"""
-        print("I am  here 2")
-        try:
-            import google.generativeai as genai
-            genai.configure(api_key=self.google_api_key)
-            
-            # Use gemini-2.5-flash-lite for all operations
-            model_name = "gemini-2.5-flash-lite"
-            try:
-                model = genai.GenerativeModel(model_name)
-            except:
-                # Fallback to gemini-2.0-flash-lite if 2.5 is not available
-                try:
-                    model = genai.GenerativeModel("gemini-2.0-flash-lite")
-                except:
-                    # Final fallback to gemini-1.5-flash-lite
-                    model = genai.GenerativeModel("gemini-1.5-flash-lite")
-            
-            if codebase:
-                prompt = self._build_codebase_prompt(query, analysis)
-            else:
-                prompt = self._build_text_prompt(query)
-            
-            # Build the full prompt with system message
-            full_prompt = f"{self._get_system_prompt(codebase)}\n\n{prompt}"
-            
-            # Configure generation parameters
-            generation_config = {
-                "temperature": 0.3 if codebase else self.temperature,
-                "max_output_tokens": 16384,  # Increased for more complete code responses
-            }
-            
-            # Generate response
-            response = model.generate_content(
-                full_prompt,
-                generation_config=generation_config
-            )
-            
-            # Extract text content from response
-            if hasattr(response, 'text'):
-                content = response.text
-            elif hasattr(response, 'candidates') and response.candidates:
-                content = response.candidates[0].content.parts[0].text
-            else:
-                raise ValueError("Unable to extract text from Gemini response")
-            
-            # Log response for debugging (first 500 chars)
-            print(f"Gemini response preview: {content[:500]}...")
-            
-            if codebase:
-                parsed = self._parse_codebase_response(content, analysis)
-                print(f"Parsed {len(parsed.get('files', {}))} files from response")
-                return parsed
-            else:
-                return {"content": content}
-        
-        except Exception as e:
-            print(f"Gemini API error: {e}")
-            print(f"Error details: {type(e).__name__}")
-            if codebase:
-                print("Falling back to enhanced code generation based on query...")
-                return await self._generate_enhanced_fallback(query, analysis, None)
-            else:
-                return {"content": f"Error generating response: {str(e)}"}
+    try:
+        from google.api_core import exceptions as google_exceptions
+        if isinstance(error, (google_exceptions.ServiceUnavailable, google_exceptions.InternalServerError,
+                              google_exceptions.DeadlineExceeded, google_exceptions.TooManyRequests)):
+            return True
+    except ImportError:
+        pass
     
-    def _get_system_prompt(self, codebase: bool) -> str:
-        """Get system prompt based on output type"""
-        if codebase:
-            return """You are an expert software developer. Your task is to generate COMPLETE, PRODUCTION-READY code that EXACTLY matches what the user requested.
+    return False
+
+
+# Prompts. The static text lives in module constants; only the per-query parts are filled in.
+# Queries can carry uploaded file contents, so nothing keyed on the query is memoized.
+_SYSTEM_PROMPT_CODEBASE = """You are an expert software developer. Your task is to generate COMPLETE, PRODUCTION-READY code that EXACTLY matches what the user requested.
 
 CRITICAL REQUIREMENTS - CODE COMPLETENESS:
 1. Read the user's query CAREFULLY and understand EVERY requirement
@@ -380,18 +358,12 @@ You MUST include a comprehensive README.md file with:
 8. Any configuration needed
 
 The README must be detailed enough that someone can clone the project and run it immediately."""
-        else:
-            return """You are a helpful AI assistant. Provide clear, informative, and well-structured text responses that directly answer the user's query."""
-    
-    def _build_codebase_prompt(self, query: str, analysis: Dict[str, Any]) -> str:
-        """Build prompt for codebase generation"""
-        language = analysis.get("language", "python")
-        framework = analysis.get("framework")
-        
-        # Extract specific requirements from query
-        requirements = self._extract_requirements(query)
-        
-        prompt = f"""IMPORTANT: Generate COMPLETE, RUNNABLE code that EXACTLY implements what the user requested. The code must be production-ready and executable.
+
+_SYSTEM_PROMPT_TEXT = """You are a helpful AI assistant. Provide clear, informative, and well-structured text responses that directly answer the user's query."""
+
+_SYSTEM_PROMPTS = {True: _SYSTEM_PROMPT_CODEBASE, False: _SYSTEM_PROMPT_TEXT}
+
+_CODEBASE_PROMPT_TEMPLATE = """IMPORTANT: Generate COMPLETE, RUNNABLE code that EXACTLY implements what the user requested. The code must be production-ready and executable.
 
 USER REQUEST:
 {query}
@@ -401,7 +373,7 @@ SPECIFIC REQUIREMENTS IDENTIFIED:
 
 TECHNICAL SPECIFICATIONS:
 - Primary Language: {language}
-{f"- Framework: {framework}" if framework else "- Framework: None specified (use standard libraries or most appropriate)"}
+{framework_line}
 - Code Style: Follow {language} best practices
 
 CRITICAL INSTRUCTIONS - READ CAREFULLY:
@@ -462,133 +434,910 @@ CODE COMPLETENESS CHECKLIST:
 ✓ Code can be executed immediately after setup
 
 Remember: Generate COMPLETE, PRODUCTION-READY code. Someone should be able to install dependencies and run the code immediately without any modifications."""
+
+_TEXT_PROMPT_TEMPLATE = """Please provide a comprehensive, well-structured response to the following query:
+
+{query}
+
+Make sure your response is:
+- Clear and informative
+- Well-organized with proper sections
+- Easy to understand
+- Comprehensive but concise"""
+
+
+# Static README sections shared by the generated-README builders
+_README_PY_PREREQS = """- Python 3.8 or higher
+- pip (Python package manager)
+"""
+
+_README_JS_PREREQS = """- Node.js 14.x or higher
+- npm (Node Package Manager)
+"""
+
+_README_PY_INSTALL = """1. Create a virtual environment (recommended):
+   ```bash
+   python -m venv venv
+   
+   # On Windows:
+   venv\\Scripts\\activate
+   
+   # On macOS/Linux:
+   source venv/bin/activate
+   ```
+
+2. Install dependencies:
+   ```bash
+   pip install -r requirements.txt
+   ```
+"""
+
+_README_JS_INSTALL = """1. Install dependencies:
+   ```bash
+   npm install
+   ```
+"""
+
+_README_FASTAPI_RUN = """Run the FastAPI application:
+   ```bash
+   uvicorn main:app --reload
+   ```
+   
+   Or if using app.py:
+   ```bash
+   uvicorn app:app --reload
+   ```
+   
+   The application will be available at: http://localhost:8000
+"""
+
+_README_FLASK_RUN = """Run the Flask application:
+   ```bash
+   python {main_file}
+   ```
+   
+   The application will be available at: http://localhost:5000
+"""
+
+_README_EXPRESS_RUN = """Run the Express server:
+   ```bash
+   npm start
+   ```
+   
+   Or:
+   ```bash
+   node main.js
+   ```
+   
+   The server will be available at: http://localhost:3000
+"""
+
+# Entry-point detection for generated READMEs, most specific first
+_MAIN_SUFFIXES = ('main.py', 'main.js', 'main.ts')
+_EXACT_MAINS = frozenset({'app.py', 'index.js'})
+_SOURCE_SUFFIXES = ('.py', '.js', '.ts')
+
+# Run instructions for web frameworks; {main_file} is the detected entry point
+_RUN_BLOCK = MappingProxyType({
+    "fastapi": _README_FASTAPI_RUN,
+    "flask": _README_FLASK_RUN,
+    "express": _README_EXPRESS_RUN
+})
+
+_README_NOTES = """
+## Usage
+
+Please refer to the code comments and implementation for usage details.
+
+## Notes
+
+- This code was automatically generated. Please review and test before production use.
+- Make sure all dependencies are installed before running.
+"""
+
+_README_PY_QUICKSTART = """1. Create a virtual environment (recommended):
+   ```bash
+   python -m venv venv
+   source venv/bin/activate  # On Windows: venv\\Scripts\\activate
+   ```
+
+2. Install dependencies:
+   ```bash
+   pip install -r requirements.txt
+   ```
+
+3. Run the application:
+   ```bash
+   python main.py
+   ```
+"""
+
+_README_JS_QUICKSTART = """1. Install dependencies:
+   ```bash
+   npm install
+   ```
+
+2. Run the application:
+   ```bash
+   npm start
+   # or
+   node main.js
+   ```
+"""
+
+_README_NEXT_STEPS = """
+## Implementation Notes
+This code was generated based on your query. Please review and customize as needed to fully implement all requirements.
+
+## Next Steps
+1. Review the generated code
+2. Implement any missing functionality
+3. Add tests
+4. Customize based on your specific needs
+"""
+
+
+def _extract_requirements(query_lower: str) -> str:
+    """Extract specific requirements from the lowercased query to help the LLM understand better"""
+    terms = _query_terms(query_lower)
+    
+    # Detect specific features
+    requirements = [requirement for keywords, requirement in _REQUIREMENT_KEYWORDS if keywords & terms]
+    
+    if not requirements:
+        requirements.append("- Implement the functionality described in the user's request")
+    
+    return "\n".join(requirements)
+
+
+def _render_codebase_prompt(query: str, language: str, framework: Optional[str]) -> str:
+    """Build prompt for codebase generation"""
+    if framework:
+        framework_line = f"- Framework: {framework}"
+    else:
+        framework_line = "- Framework: None specified (use standard libraries or most appropriate)"
+    
+    return _CODEBASE_PROMPT_TEMPLATE.format(
+        query=query,
+        requirements=_extract_requirements(query.lower()),
+        language=language,
+        framework_line=framework_line
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _render_comprehensive_readme(filenames: Tuple[str, ...], language: str, framework: Optional[str]) -> str:
+    """Generate a comprehensive README based on generated files"""
+    # Detect main entry point, else any Python/JS file
+    main_file = (
+        next((f for f in filenames if f.endswith(_MAIN_SUFFIXES) or f in _EXACT_MAINS), None)
+        or next((f for f in filenames if f.endswith(_SOURCE_SUFFIXES)), None)
+    )
+    
+    # Detect if it's a web app
+    is_web_app = any('app' in f.lower() or 'server' in f.lower() or 'api' in f.lower() 
+                     for f in filenames) or framework in ['fastapi', 'flask', 'express', 'react']
+    
+    # Detect dependencies file
+    has_requirements = 'requirements.txt' in filenames
+    has_package_json = 'package.json' in filenames
+    
+    readme_parts = [f"""# Generated Project
+
+## Description
+This project was generated by SimpleAgent. Please review the code and customize as needed.
+
+## Technology Stack
+- Language: {language}
+{f"- Framework: {framework}" if framework else ""}
+
+## Prerequisites
+"""]
+    
+    if language == "python":
+        readme_parts.append(_README_PY_PREREQS)
+        if framework:
+            readme_parts.append(f"- {framework} framework\n")
+    elif language in ["javascript", "typescript"]:
+        readme_parts.append(_README_JS_PREREQS)
+        if framework:
+            readme_parts.append(f"- {framework} framework\n")
+    
+    readme_parts.append("\n## Installation\n\n")
+    
+    if language == "python":
+        readme_parts.append(_README_PY_INSTALL)
+    elif language in ["javascript", "typescript"]:
+        readme_parts.append(_README_JS_INSTALL)
+    
+    readme_parts.append("\n## How to Run\n\n")
+    
+    run_block = _RUN_BLOCK.get(framework) if is_web_app else None
+    if run_block:
+        readme_parts.append(run_block.format(main_file=main_file or 'app.py'))
+    elif is_web_app:
+        if main_file:
+            if language == "python":
+                readme_parts.append(f"""Run the application:
+   ```bash
+   python {main_file}
+   ```
+""")
+            else:
+                readme_parts.append(f"""Run the application:
+   ```bash
+   node {main_file}
+   ```
+""")
+    else:
+        if main_file:
+            if language == "python":
+                readme_parts.append(f"""Run the script:
+   ```bash
+   python {main_file}
+   ```
+""")
+            else:
+                readme_parts.append(f"""Run the script:
+   ```bash
+   node {main_file}
+   ```
+""")
+        else:
+            readme_parts.append("""Run the main file:
+   ```bash
+   python main.py
+   ```
+   (Adjust the command based on your main entry point)
+""")
+    
+    readme_parts.append("\n## Project Structure\n\n")
+    readme_parts.append("Key files in this project:\n\n")
+    for filename in sorted(filenames)[:10]:  # Show first 10 files
+        readme_parts.append(f"- `{filename}`\n")
+    
+    readme_parts.append(_README_NOTES)
+    if not has_requirements and not has_package_json:
+        readme_parts.append("- **Important**: Dependencies file may be missing. Please check and add required packages.\n")
+    
+    return "".join(readme_parts)
+
+
+def _render_readme(query: str, requirements: str, language: str, framework: Optional[str]) -> str:
+    """Generate comprehensive README"""
+    readme_parts = [f"""# Generated Project
+
+## Description
+This project was generated by SimpleAgent based on the following request:
+
+{query}
+
+## Requirements Identified
+{requirements}
+
+## Technology Stack
+- Language: {language}
+{f"- Framework: {framework}" if framework else ""}
+
+## Setup Instructions
+
+### Prerequisites
+- {language.capitalize()} installed
+{f"- {framework} framework" if framework else ""}
+
+### Installation
+"""]
+    
+    if language == "python":
+        readme_parts.append(_README_PY_QUICKSTART)
+    elif language in ["javascript", "typescript"]:
+        readme_parts.append(_README_JS_QUICKSTART)
+    
+    readme_parts.append(_README_NEXT_STEPS)
+    
+    return "".join(readme_parts)
+
+
+class SimpleAgent:
+    """
+    Main agent class that processes queries and generates appropriate outputs
+    """
+    
+    def __init__(self):
+        """Initialize the agent with configuration"""
+        self.openai_api_key = settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
+        self.anthropic_api_key = settings.ANTHROPIC_API_KEY or os.getenv("ANTHROPIC_API_KEY")
+        self.google_api_key = settings.GOOGLE_API_KEY or os.getenv("GOOGLE_API_KEY")
+        self.model = settings.DEFAULT_MODEL
+        self.temperature = settings.DEFAULT_TEMPERATURE
+        self.race_providers = settings.RACE_PROVIDERS
+        
+        # Determine which APIs are available (key configured and SDK installed)
+        self.use_openai = bool(self.openai_api_key) and _HAS_OPENAI
+        self.use_anthropic = bool(self.anthropic_api_key) and _HAS_ANTHROPIC
+        self.use_gemini = bool(self.google_api_key) and _HAS_GEMINI
+        for name, key, installed in (("openai", self.openai_api_key, _HAS_OPENAI),
+                                     ("anthropic", self.anthropic_api_key, _HAS_ANTHROPIC),
+                                     ("google-generativeai", self.google_api_key, _HAS_GEMINI)):
+            if key and not installed:
+                logger.warning("API key set but the %s package is not installed; skipping provider", name)
+        
+        # Provider clients hold connection pools, so build them once and reuse them.
+        # OpenAI and Anthropic share one HTTP client, so warm TLS connections are reused across both.
+        self._http = None
+        self._openai = None
+        self._anthropic = None
+        self._gemini_model = None
+        self.gemini_model_name = GEMINI_MODELS[0]
+        if self.use_openai or self.use_anthropic:
+            import httpx
+            self._http = httpx.AsyncClient(
+                http2=_HAS_HTTP2,
+                timeout=settings.LLM_HTTP_TIMEOUT,
+                limits=httpx.Limits(max_keepalive_connections=50, max_connections=100)
+            )
+        if self.use_openai:
+            from openai import AsyncOpenAI
+            self._openai = AsyncOpenAI(api_key=self.openai_api_key, http_client=self._http)
+        if self.use_anthropic:
+            from anthropic import AsyncAnthropic
+            self._anthropic = AsyncAnthropic(api_key=self.anthropic_api_key, http_client=self._http)
+        if self.use_gemini:
+            import google.generativeai as genai
+            genai.configure(api_key=self.google_api_key)
+            self.gemini_model_name = self._resolve_gemini_model(genai)
+            self._gemini_model = genai.GenerativeModel(self.gemini_model_name)
+        
+        # Providers are tried in order (OpenAI > Anthropic > Google) until one succeeds
+        self.providers = [
+            (name, generate) for name, generate, enabled in (
+                ("openai", self._generate_with_openai, self.use_openai),
+                ("anthropic", self._generate_with_anthropic, self.use_anthropic),
+                ("gemini", self._generate_with_gemini, self.use_gemini),
+            ) if enabled
+        ]
+        # Keep in-flight requests per provider below its rate limit
+        limits = {
+            "openai": (settings.OPENAI_MAX_CONCURRENCY, settings.OPENAI_REQUESTS_PER_MINUTE),
+            "anthropic": (settings.ANTHROPIC_MAX_CONCURRENCY, settings.ANTHROPIC_REQUESTS_PER_MINUTE),
+            "gemini": (settings.GEMINI_MAX_CONCURRENCY, settings.GEMINI_REQUESTS_PER_MINUTE),
+        }
+        self.sems = {name: asyncio.Semaphore(limits[name][0]) for name, _ in self.providers}
+        self.limiters = {}
+        for name, _ in self.providers:
+            rpm = limits[name][1]
+            if rpm and AsyncLimiter is not None:
+                self.limiters[name] = AsyncLimiter(rpm, 60)
+            elif rpm:
+                logger.warning("aiolimiter not installed, ignoring %s requests-per-minute limit", name)
+        
+        # Circuit breaker state: consecutive failures and when the circuit was opened
+        self.failures = {name: 0 for name, _ in self.providers}
+        self.opened_at = {name: 0.0 for name, _ in self.providers}
+        
+        self.cache = (
+            create_cache(settings.LLM_CACHE_MAX_SIZE, settings.LLM_CACHE_REDIS_URL)
+            if settings.LLM_CACHE_ENABLED else None
+        )
+        # Paraphrase-tolerant cache for generated codebases (optional dependencies)
+        self.semantic_cache = (
+            create_semantic_cache(
+                settings.SEMANTIC_CACHE_MODEL, settings.SEMANTIC_CACHE_THRESHOLD,
+                settings.SEMANTIC_CACHE_TTL, settings.SEMANTIC_CACHE_MAX_ENTRIES
+            )
+            if settings.SEMANTIC_CACHE_ENABLED else None
+        )
+    
+    async def aclose(self) -> None:
+        """Close the shared HTTP client and its pooled connections"""
+        if self._http is not None:
+            await self._http.aclose()
+    
+    async def stream_query(self, query: str, has_upload: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of process_query. For codebases, yields {'type': 'file', 'path', 'content'}
+        events as the LLM finishes each file; always ends with a {'type': 'result', 'result'} event
+        holding what process_query would have returned.
+        A {'type': 'reset'} event means the files sent so far are void: a provider failed mid-stream
+        and the next one takes over, or its output was replaced by the offline fallback.
+        """
+        analysis = await self._analyze_query(query)
+        if not (analysis["should_generate_code"] and settings.ENABLE_CODE_GENERATION):
+            yield {"type": "result", "result": await self._text_result(query, analysis)}
+            return
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def produce() -> Dict[str, Any]:
+            try:
+                return await self._generate_codebase(query, analysis, file_queue=queue, has_upload=has_upload)
+            finally:
+                queue.put_nowait(None)
+        
+        task = asyncio.create_task(produce())
+        try:
+            sent_files = False
+            while (item := await queue.get()) is not None:
+                if item is _FILES_RESET:
+                    if sent_files:
+                        yield {"type": "reset"}
+                        sent_files = False
+                    continue
+                path, content = item
+                yield {"type": "file", "path": path, "content": content}
+                sent_files = True
+            yield {"type": "result", "result": self._codebase_result(await task, analysis)}
+        finally:
+            task.cancel()
+    
+    def _resolve_gemini_model(self, genai) -> str:
+        """Pick the first preferred Gemini model that this API key can generate content with"""
+        try:
+            available = {
+                model.name.split("/")[-1] for model in genai.list_models()
+                if "generateContent" in model.supported_generation_methods
+            }
+        except Exception as e:
+            logger.warning("Could not list Gemini models (%s), using %s", e, GEMINI_MODELS[0])
+            return GEMINI_MODELS[0]
+        
+        return next((name for name in GEMINI_MODELS if name in available), GEMINI_MODELS[0])
+    
+    async def process_query(self, query: str, has_upload: bool = False) -> Dict[str, Any]:
+        """
+        Process the user query and determine the appropriate response type
+        
+        Args:
+            query: User query, including any uploaded file's text
+            has_upload: Whether the query carries uploaded file text (never semantically cached)
+        
+        Returns:
+            Dict with 'type' ('codebase' or 'text'), 'content', and 'metadata'
+        """
+        # Analyze query to determine if code generation is appropriate
+        analysis = await self._analyze_query(query)
+        
+        if analysis["should_generate_code"] and settings.ENABLE_CODE_GENERATION:
+            # Generate codebase
+            codebase = await self._generate_codebase(query, analysis, has_upload=has_upload)
+            return self._codebase_result(codebase, analysis)
+        else:
+            # Generate text response
+            return await self._text_result(query, analysis)
+    
+    def _codebase_result(self, codebase: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "type": "codebase",
+            "content": codebase,
+            "metadata": {
+                "language": analysis.get("language", "python"),
+                "framework": analysis.get("framework"),
+                "structure": codebase.get("structure", {})
+            }
+        }
+    
+    async def _text_result(self, query: str, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        text_response = await self._generate_text_response(query, analysis)
+        return {
+            "type": "text",
+            "content": text_response,
+            "metadata": {
+                "reason": analysis.get("reason", "Query not suitable for code generation")
+            }
+        }
+    
+    async def _analyze_query(self, query: str) -> Dict[str, Any]:
+        """
+        Analyze the query to determine if code generation is appropriate
+        """
+        terms = _query_terms(query.lower())
+        code_score = len(_CODE_KEYWORDS & terms)
+        text_score = len(_TEXT_KEYWORDS & terms)
+        
+        should_generate_code = code_score > text_score and code_score > 0
+        
+        # Language and framework are both derived from the same (usually tiny) set of stack hits
+        stack_hits = _STACK_KEYWORDS & terms
+        
+        # Detect programming language
+        language = self._detect_language(stack_hits)
+        
+        # Detect framework
+        framework = self._detect_framework(stack_hits)
+        
+        return {
+            "should_generate_code": should_generate_code,
+            "code_score": code_score,
+            "text_score": text_score,
+            "language": language,
+            "framework": framework,
+            "reason": "Code generation suitable" if should_generate_code else "Query better suited for text response"
+        }
+    
+    def _detect_language(self, stack_hits: FrozenSet[str]) -> str:
+        """Detect programming language from the query's language/framework keyword hits"""
+        languages = {_LANGUAGE_BY_KEYWORD[k] for k in stack_hits if k in _LANGUAGE_BY_KEYWORD}
+        if languages:
+            # Keep the priority order of _LANGUAGE_KEYWORDS when several languages match
+            return next(lang for lang in _LANGUAGE_KEYWORDS if lang in languages)
+        
+        return "python"  # Default
+    
+    def _detect_framework(self, stack_hits: FrozenSet[str]) -> Optional[str]:
+        """Detect framework from the query's language/framework keyword hits"""
+        if stack_hits:
+            for framework in _FRAMEWORKS:
+                if framework in stack_hits:
+                    return framework
+        
+        return None
+    
+    async def _generate_codebase(self, query: str, analysis: Dict[str, Any],
+                                 file_queue: Optional[asyncio.Queue] = None,
+                                 has_upload: bool = False) -> Dict[str, Any]:
+        """
+        Generate a codebase structure based on the query.
+        If file_queue is given, (path, content) pairs are put on it as the LLM completes each file.
+        """
+        if not self.providers:
+            # No API keys - generate enhanced fallback
+            logger.warning("No API keys configured. Generating enhanced fallback code based on query.")
+            return await self._generate_enhanced_fallback(query, analysis, None)
+        
+        # Code generation runs at low temperature, so a paraphrased query can reuse an earlier codebase.
+        # Uploaded documents are private to their request, so those queries are neither matched nor stored.
+        semantic_cache = None if has_upload else self.semantic_cache
+        if semantic_cache is not None:
+            cached = await semantic_cache.get(query, analysis.get("language"), analysis.get("framework"))
+            if cached is not None:
+                await self._publish_files(file_queue, cached.get("files", {}))
+                return cached
+        
+        try:
+            # Racing would interleave two providers' files on the queue, so only race unstreamed calls
+            if self.race_providers and len(self.providers) > 1 and file_queue is None:
+                result = await self._race_providers(query, analysis, codebase=True)
+            else:
+                result = await self._call_providers(query, analysis, codebase=True, file_queue=file_queue)
+        except Exception:
+            logger.info("Falling back to enhanced code generation based on query")
+            return await self._generate_enhanced_fallback(query, analysis, None)
+        
+        # Check if we got empty files or fallback code
+        if not result.get("files") or self._is_fallback_code(result):
+            logger.warning("Received empty or fallback code, generating enhanced code based on query")
+            await self._reset_files(file_queue)
+            return await self._generate_enhanced_fallback(query, analysis, result)
+        
+        if semantic_cache is not None:
+            await semantic_cache.set(query, result, analysis.get("language"), analysis.get("framework"))
+        return result
+    
+    async def _generate_text_response(self, query: str, analysis: Dict[str, Any]) -> str:
+        """
+        Generate a text response for queries not suitable for code generation
+        """
+        if not self.providers:
+            return f"Response to query: {query}\n\nThis query is better suited for an informational response rather than code generation."
+        
+        try:
+            result = await self._call_providers(query, analysis, codebase=False)
+        except Exception as e:
+            return f"Error generating response: {str(e)}"
+        return result.get("content", "Unable to generate response.")
+    
+    async def _call_providers(self, query: str, analysis: Dict[str, Any], codebase: bool,
+                              exclude: Tuple[str, ...] = (),
+                              file_queue: Optional[asyncio.Queue] = None) -> Dict[str, Any]:
+        """
+        Try each configured provider in order, moving on to the next one on transient errors.
+        Raises the last error once every provider has failed or been skipped.
+        """
+        last_error: Optional[Exception] = None
+        for name, generate in self.providers:
+            if name in exclude:
+                continue
+            if not self._provider_available(name):
+                logger.info("Skipping %s: circuit open after repeated failures", name)
+                continue
+            try:
+                result = await generate(query, analysis, codebase=codebase, file_queue=file_queue)
+            except Exception as e:
+                logger.error("%s API error (%s): %s", name, type(e).__name__, e)
+                # Whatever the failed call streamed is replaced by the next provider or the fallback
+                await self._reset_files(file_queue)
+                last_error = e
+                if not _is_retryable_error(e):
+                    # Client errors (bad key, bad request) won't be fixed by another provider
+                    break
+                self._record_failure(name)
+                continue
+            self._record_success(name)
+            return result
         
-        return prompt
+        raise last_error or RuntimeError("No LLM provider available")
     
-    def _extract_requirements(self, query: str) -> str:
-        """Extract specific requirements from the query to help the LLM understand better"""
-        requirements = []
-        query_lower = query.lower()
+    async def _race_providers(self, query: str, analysis: Dict[str, Any], codebase: bool) -> Dict[str, Any]:
+        """
+        Run the top two healthy providers concurrently and keep the first successful answer.
+        The slower call is cancelled; if both fail transiently, the remaining providers are tried in order.
+        """
+        # Stop at two so providers that won't run don't use up their half-open probe
+        contenders = []
+        for name, generate in self.providers:
+            if len(contenders) == 2:
+                break
+            if self._provider_available(name):
+                contenders.append((name, generate))
+        tasks = {
+            asyncio.create_task(generate(query, analysis, codebase=codebase)): name
+            for name, generate in contenders
+        }
+        pending = set(tasks)
+        fatal_error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = tasks[task]
+                    error = task.exception()
+                    if error is None:
+                        self._record_success(name)
+                        return task.result()
+                    logger.error("%s API error (%s): %s", name, type(error).__name__, error)
+                    if _is_retryable_error(error):
+                        self._record_failure(name)
+                    else:
+                        fatal_error = error
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        if fatal_error:
+            raise fatal_error
+        return await self._call_providers(query, analysis, codebase, exclude=tuple(tasks.values()))
+    
+    def _provider_available(self, name: str) -> bool:
+        """Closed circuits always pass; open ones let a single probe through after the cooldown"""
+        if self.failures[name] < settings.CIRCUIT_BREAKER_THRESHOLD:
+            return True
+        now = time.time()
+        if now - self.opened_at[name] < settings.CIRCUIT_BREAKER_COOLDOWN:
+            return False
+        # Restart the cooldown while the probe is in flight so concurrent requests keep skipping
+        # this provider; the probe's outcome then closes the circuit or re-opens it
+        self.opened_at[name] = now
+        return True
+    
+    def _record_success(self, name: str) -> None:
+        self.failures[name] = 0
+    
+    def _record_failure(self, name: str) -> None:
+        self.failures[name] += 1
+        if self.failures[name] >= settings.CIRCUIT_BREAKER_THRESHOLD:
+            self.opened_at[name] = time.time()
+    
+    async def _generate_with_openai(self, query: str, analysis: Dict[str, Any], codebase: bool,
+                                    file_queue: Optional[asyncio.Queue] = None) -> Dict[str, Any]:
+        """Generate response using OpenAI API"""
+        if codebase:
+            prompt = self._build_codebase_prompt(query, analysis)
+        else:
+            prompt = self._build_text_prompt(query)
+        
+        # Use lower temperature for code generation to be more deterministic
+        temp = 0.3 if codebase else self.temperature
+        max_tokens = 8000  # Allow for longer code responses
+        messages = [
+            {"role": "system", "content": self._get_system_prompt(codebase)},
+            {"role": "user", "content": prompt}
+        ]
+        
+        cache_key = self._cache_key(self.model, messages, temp, max_tokens)
+        cached = await self._cached(cache_key, file_queue)
+        if cached is not None:
+            return cached
+        
+        async with self._throttle("openai"):
+            stream = await self._openai.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temp,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            content = await self._collect_stream(_openai_deltas(stream), codebase, file_queue)
+        
+        return await self._finish_response("OpenAI", content, codebase, analysis, cache_key)
+    
+    async def _generate_with_anthropic(self, query: str, analysis: Dict[str, Any], codebase: bool,
+                                       file_queue: Optional[asyncio.Queue] = None) -> Dict[str, Any]:
+        """Generate response using Anthropic API"""
+        if codebase:
+            prompt = self._build_codebase_prompt(query, analysis)
+        else:
+            prompt = self._build_text_prompt(query)
+        
+        # Use lower temperature for code generation
+        temp = 0.3 if codebase else 0.7
+        max_tokens = 8000  # Allow for longer code responses
+        messages = [
+            {"role": "user", "content": f"{self._get_system_prompt(codebase)}\n\n{prompt}"}
+        ]
+        
+        cache_key = self._cache_key(ANTHROPIC_MODEL, messages, temp, max_tokens)
+        cached = await self._cached(cache_key, file_queue)
+        if cached is not None:
+            return cached
         
-        # Detect specific features
-        if "authentication" in query_lower or "login" in query_lower or "auth" in query_lower:
-            requirements.append("- User authentication/login functionality")
-        if "database" in query_lower or "db" in query_lower or "sql" in query_lower:
-            requirements.append("- Database integration")
-        if "api" in query_lower or "rest" in query_lower or "endpoint" in query_lower:
-            requirements.append("- API endpoints/REST API")
-        if "crud" in query_lower or "create" in query_lower or "read" in query_lower or "update" in query_lower or "delete" in query_lower:
-            requirements.append("- CRUD operations")
-        if "todo" in query_lower or "task" in query_lower:
-            requirements.append("- Todo/task management features")
-        if "web" in query_lower or "website" in query_lower or "html" in query_lower:
-            requirements.append("- Web interface/HTML pages")
-        if "visualization" in query_lower or "chart" in query_lower or "graph" in query_lower or "plot" in query_lower:
-            requirements.append("- Data visualization/charts")
-        if "csv" in query_lower or "excel" in query_lower or "data" in query_lower:
-            requirements.append("- Data file processing")
-        if "cli" in query_lower or "command" in query_lower or "terminal" in query_lower:
-            requirements.append("- Command-line interface")
-        
-        if not requirements:
-            requirements.append("- Implement the functionality described in the user's request")
-        
-        return "\n".join(requirements)
+        async with self._throttle("anthropic"):
+            async with self._anthropic.messages.stream(
+                model=ANTHROPIC_MODEL,
+                max_tokens=max_tokens,
+                temperature=temp,
+                messages=messages
+            ) as stream:
+                content = await self._collect_stream(stream.text_stream, codebase, file_queue)
+        
+        return await self._finish_response("Anthropic", content, codebase, analysis, cache_key)
+    
+    async def _generate_with_gemini(self, query: str, analysis: Dict[str, Any], codebase: bool,
+                                    file_queue: Optional[asyncio.Queue] = None) -> Dict[str, Any]:
+        """Generate response using Google Gemini API"""
+        if codebase:
+            prompt = self._build_codebase_prompt(query, analysis)
+        else:
+            prompt = self._build_text_prompt(query)
+        
+        # Build the full prompt with system message
+        full_prompt = f"{self._get_system_prompt(codebase)}\n\n{prompt}"
+        
+        # Configure generation parameters
+        generation_config = {
+            "temperature": 0.3 if codebase else self.temperature,
+            "max_output_tokens": 16384,  # Increased for more complete code responses
+        }
+        
+        cache_key = self._cache_key(
+            self.gemini_model_name, full_prompt,
+            generation_config["temperature"], generation_config["max_output_tokens"]
+        )
+        cached = await self._cached(cache_key, file_queue)
+        if cached is not None:
+            return cached
+        
+        # Generate response
+        async with self._throttle("gemini"):
+            response = await self._gemini_model.generate_content_async(
+                full_prompt,
+                generation_config=generation_config,
+                stream=True
+            )
+            content = await self._collect_stream(_gemini_deltas(response), codebase, file_queue)
+        
+        if not content:
+            raise ValueError("Unable to extract text from Gemini response")
+        
+        return await self._finish_response("Gemini", content, codebase, analysis, cache_key)
+    
+    async def _cached(self, cache_key: Optional[str], file_queue: Optional[asyncio.Queue]) -> Optional[Dict[str, Any]]:
+        """Look up a provider response in the LLM cache, sending a cached codebase's files to the stream"""
+        if not cache_key:
+            return None
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            await self._publish_files(file_queue, cached.get("files", {}))
+        return cached
+    
+    async def _finish_response(self, provider: str, content: str, codebase: bool,
+                               analysis: Dict[str, Any], cache_key: Optional[str]) -> Dict[str, Any]:
+        """Parse a provider's completed response and store it in the LLM cache"""
+        # Log response for debugging (first 500 chars)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s response preview: %s...", provider, content[:500])
+        
+        if codebase:
+            parsed = self._parse_codebase_response(content, analysis)
+            logger.debug("Parsed %d files from response", len(parsed.get("files", {})))
+        else:
+            parsed = {"content": content}
+        
+        # Don't pin unparseable responses in the cache
+        if cache_key and (parsed.get("files") or not codebase):
+            await self.cache.set(cache_key, parsed, ttl=settings.LLM_CACHE_TTL)
+        return parsed
+    
+    async def _collect_stream(self, deltas: AsyncIterator[str], codebase: bool,
+                              file_queue: Optional[asyncio.Queue]) -> str:
+        """
+        Accumulate a streamed completion. When a codebase is streamed to a queue, each file
+        is published as soon as the scanner sees its closing fence or the next FILE: marker.
+        """
+        parts = []
+        scanner = _CodebaseScanner() if codebase and file_queue is not None else None
+        async for delta in deltas:
+            parts.append(delta)
+            if scanner:
+                for item in scanner.feed(delta):
+                    await file_queue.put(item)
+        if scanner:
+            for item in scanner.finish():
+                await file_queue.put(item)
+        return "".join(parts)
+    
+    async def _publish_files(self, file_queue: Optional[asyncio.Queue], files: Dict[str, str]) -> None:
+        """Send already complete files (e.g. from the cache) to a streaming consumer"""
+        if file_queue is None:
+            return
+        for item in files.items():
+            await file_queue.put(item)
+    
+    async def _reset_files(self, file_queue: Optional[asyncio.Queue]) -> None:
+        """Tell a streaming consumer to discard the files it has been sent so far"""
+        if file_queue is not None:
+            await file_queue.put(_FILES_RESET)
+    
+    @asynccontextmanager
+    async def _throttle(self, provider: str):
+        """Hold a concurrency slot, and a rate-limit token if configured, for one provider call"""
+        async with self.sems[provider]:
+            limiter = self.limiters.get(provider)
+            if limiter is not None:
+                await limiter.acquire()
+            yield
+    
+    def _cache_key(self, model: str, prompt: Any, temp: float, max_tokens: int) -> Optional[str]:
+        """Hash the request payload into a cache key; None when the call should not be cached"""
+        if self.cache is None or temp > CACHE_MAX_TEMPERATURE:
+            return None
+        payload = {
+            "model": model,
+            "messages": prompt,
+            "temperature": temp,
+            "max_tokens": max_tokens
+        }
+        if orjson is not None:
+            data = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        else:
+            data = json.dumps(payload, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(data).hexdigest()
+    
+    def _get_system_prompt(self, codebase: bool) -> str:
+        """Get system prompt based on output type"""
+        return _SYSTEM_PROMPTS[codebase]
+    
+    def _build_codebase_prompt(self, query: str, analysis: Dict[str, Any]) -> str:
+        """Build prompt for codebase generation"""
+        return _render_codebase_prompt(query, analysis.get("language", "python"), analysis.get("framework"))
+    
+    def _extract_requirements(self, query_lower: str) -> str:
+        """Extract specific requirements from the lowercased query to help the LLM understand better"""
+        return _extract_requirements(query_lower)
     
     def _build_text_prompt(self, query: str) -> str:
         """Build prompt for text response"""
-        return f"""Please provide a comprehensive, well-structured response to the following query:
-
-{query}
-
-Make sure your response is:
-- Clear and informative
-- Well-organized with proper sections
-- Easy to understand
-- Comprehensive but concise"""
+        return _TEXT_PROMPT_TEMPLATE.format(query=query)
     
     def _parse_codebase_response(self, content: str, analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Parse LLM response into structured codebase format"""
-        files = {}
-        current_file = None
-        current_content = []
-        in_code_block = False
-        code_block_lang = None
-        
-        lines = content.split('\n')
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-            
-            # Check for FILE: marker
-            if line.strip().startswith('FILE:'):
-                if current_file:
-                    files[current_file] = '\n'.join(current_content).strip()
-                current_file = line.replace('FILE:', '').strip()
-                current_content = []
-                in_code_block = False
-            # Check for code block markers
-            elif line.strip().startswith('```'):
-                if not in_code_block:
-                    # Starting a code block
-                    in_code_block = True
-                    code_block_lang = line.strip()[3:].strip()
-                    # If we have a current file, this might be code for it
-                    if current_file and not current_content:
-                        # This is the start of code for current file
-                        pass
-                    elif not current_file:
-                        # Code block without FILE: marker - try to infer filename
-                        if code_block_lang:
-                            ext_map = {
-                                'python': 'py', 'py': 'py',
-                                'javascript': 'js', 'js': 'js',
-                                'typescript': 'ts', 'ts': 'ts',
-                                'html': 'html', 'css': 'css',
-                                'json': 'json', 'yaml': 'yml', 'yml': 'yml',
-                                'markdown': 'md', 'md': 'md'
-                            }
-                            ext = ext_map.get(code_block_lang.lower(), 'txt')
-                            if 'main' in code_block_lang.lower() or not current_file:
-                                current_file = f"main.{ext}"
-                            else:
-                                current_file = f"file.{ext}"
-                else:
-                    # Ending a code block
-                    in_code_block = False
-                    if current_file:
-                        # Save current file if we have one
-                        if current_content:
-                            files[current_file] = '\n'.join(current_content).strip()
-                        current_file = None
-                        current_content = []
-            elif current_file:
-                # We're inside a file, add line to content
-                current_content.append(line)
-            elif line.strip() and not line.startswith('```') and not in_code_block:
-                # Content that might be README or documentation
-                if not any(f.startswith('README') or f.endswith('.md') for f in files.keys()):
-                    if 'README.md' not in files:
-                        files['README.md'] = line
-                    else:
-                        files['README.md'] += '\n' + line
-            
-            i += 1
+        scanner = _CodebaseScanner()
+        scanner.feed(content)
+        scanner.finish()
+        files = scanner.files
         
-        # Save last file if exists
-        if current_file and current_content:
-            files[current_file] = '\n'.join(current_content).strip()
+        if scanner.readme_lines and not any(f.startswith('README') or f.endswith('.md') for f in files):
+            files['README.md'] = '\n'.join(scanner.readme_lines)
         
         # If no files were parsed, try alternative parsing
         if not files:
-            print("No files found with FILE: markers, trying alternative parsing...")
+            logger.info("No files found with FILE: markers, trying alternative parsing")
             files = self._parse_alternative_format(content, analysis)
         
         # If still no files, log and create enhanced fallback
         if not files:
-            print("Warning: Could not parse any files from LLM response. Content preview:")
-            print(content[:1000])
-            print("Generating enhanced fallback based on query...")
+            logger.warning("Could not parse any files from LLM response; generating enhanced fallback")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Unparseable response preview: %s", content[:1000])
             # Don't use basic structure, use enhanced fallback
             return {
                 "files": {},  # Will trigger enhanced fallback
@@ -596,16 +1345,13 @@ Make sure your response is:
             }
         
         # Ensure README.md exists - if not, generate a comprehensive one
-        readme_exists = any(
-            f.lower().endswith('readme.md') or f.lower() == 'readme.md' 
-            for f in files.keys()
-        )
+        names_lower = {f.lower() for f in files}
+        readme_exists = 'readme.md' in names_lower or any(n.endswith('/readme.md') for n in names_lower)
         
         if not readme_exists:
-            print("Warning: README.md not found in generated files. Creating comprehensive README...")
+            logger.info("README.md not found in generated files, creating comprehensive README")
             language = analysis.get("language", "python")
             framework = analysis.get("framework")
-            requirements = self._extract_requirements("")  # We'll use the query from context
             
             # Generate a comprehensive README
             readme_content = self._generate_comprehensive_readme(
@@ -624,24 +1370,14 @@ Make sure your response is:
         language = analysis.get("language", "python")
         
         # Look for markdown code blocks
-        code_blocks = re.findall(r'```(\w+)?\n(.*?)```', content, re.DOTALL)
-        
-        if code_blocks:
-            for i, (lang, code) in enumerate(code_blocks):
-                lang = lang or language
-                ext_map = {
-                    'python': 'py', 'py': 'py',
-                    'javascript': 'js', 'js': 'js',
-                    'typescript': 'ts', 'ts': 'ts',
-                    'html': 'html', 'css': 'css',
-                    'json': 'json'
-                }
-                ext = ext_map.get(lang.lower(), 'txt')
-                filename = f"main.{ext}" if i == 0 else f"file_{i}.{ext}"
-                files[filename] = code.strip()
+        for i, match in enumerate(_ALT_BLOCK_RE.finditer(content)):
+            lang = match.group(1) or language
+            ext = _EXT_MAP.get(lang.lower(), 'txt')
+            filename = f"main.{ext}" if i == 0 else f"file_{i}.{ext}"
+            files[filename] = match.group(2).strip()
         
         # Extract README from text before/after code blocks
-        text_parts = re.split(r'```.*?```', content, flags=re.DOTALL)
+        text_parts = _FENCE_SPAN_RE.split(content)
         readme_text = '\n\n'.join([p.strip() for p in text_parts if p.strip() and not p.strip().startswith('FILE:')])
         if readme_text and len(readme_text) > 50:  # Only add if substantial
             files['README.md'] = readme_text
@@ -673,14 +1409,13 @@ Make sure your response is:
     def _build_structure_tree(self, files: Dict[str, str]) -> Dict[str, Any]:
         """Build a tree structure of the codebase"""
         structure = {}
-        for file_path in files.keys():
+        for file_path in files:
             parts = file_path.split('/')
             current = structure
-            for part in parts[:-1]:
-                if part not in current:
-                    current[part] = {}
-                current = current[part]
-            current[parts[-1]] = "file"
+            # Directory names repeat across paths, so intern them to share one key object
+            for part in map(sys.intern, parts[:-1]):
+                current = current.setdefault(part, {})
+            current[sys.intern(parts[-1])] = "file"
         return structure
     
     def _is_fallback_code(self, result: Dict[str, Any]) -> bool:
@@ -689,36 +1424,30 @@ Make sure your response is:
         if not files:
             return True
         
-        # Check for common fallback patterns
-        fallback_patterns = [
-            "Hello, World",
-            "TODO: Implement",
-            "basic template",
-            "placeholder",
-            "print('Hello"
-        ]
-        
+        total_code_lines = 0
         for file_path, content in files.items():
-            content_lower = content.lower()
+            code_lines = len(_CODE_LINE_RE.findall(content))
+            total_code_lines += code_lines
+            # Enough real lines overall already rules out fallback; skip the remaining files
+            if total_code_lines >= 10:
+                return False
             # If we find actual implementation code, it's not fallback
-            if any(pattern.lower() in content_lower for pattern in fallback_patterns):
+            if _has_fallback_marker(content):
                 # But check if there's also real code
                 if len(content) > 200:  # Substantial code
                     return False
                 # Check for function definitions, classes, etc.
-                if any(keyword in content for keyword in ["def ", "class ", "function ", "const ", "let ", "var "]):
-                    if len([line for line in content.split('\n') if line.strip() and not line.strip().startswith('#') and not line.strip().startswith('//')]) > 5:
-                        return False
+                if _CODE_KEYWORD_RE.search(content) and code_lines > 5:
+                    return False
         
-        # If all files are very short or contain only fallback patterns, it's fallback
-        total_code_lines = sum(len([l for l in content.split('\n') if l.strip() and not l.strip().startswith('#') and not l.strip().startswith('//')]) for content in files.values())
-        return total_code_lines < 10
+        # All files are very short or contain only fallback patterns
+        return True
     
     async def _generate_enhanced_fallback(self, query: str, analysis: Dict[str, Any], existing_result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         """Generate an enhanced fallback codebase that actually implements query requirements"""
         language = analysis.get("language", "python")
         framework = analysis.get("framework")
-        requirements = self._extract_requirements(query)
+        requirements = self._extract_requirements(query.lower())
         
         # Generate code based on detected requirements
         files = {}
@@ -756,10 +1485,11 @@ Make sure your response is:
     def _generate_python_code(self, query: str, requirements: str, framework: Optional[str]) -> str:
         """Generate Python code based on query requirements"""
         code_parts = [f'"""\nGenerated by SimpleAgent\nQuery: {query}\n"""\n']
+        query_lower = query.lower()
         
         # Add imports based on requirements
         imports = []
-        if "api" in query.lower() or "rest" in query.lower():
+        if _FEATURE_RES["api"].search(query_lower):
             if framework == "fastapi":
                 imports.append("from fastapi import FastAPI, HTTPException")
                 imports.append("from pydantic import BaseModel")
@@ -769,19 +1499,19 @@ Make sure your response is:
                 imports.append("from http.server import HTTPServer, BaseHTTPRequestHandler")
                 imports.append("import json")
         
-        if "database" in query.lower() or "db" in query.lower() or "sql" in query.lower():
+        if _FEATURE_RES["database"].search(query_lower):
             imports.append("import sqlite3")
             imports.append("import os")
         
-        if "csv" in query.lower() or "data" in query.lower():
+        if _FEATURE_RES["data"].search(query_lower):
             imports.append("import csv")
             imports.append("import pandas as pd")
         
-        if "authentication" in query.lower() or "login" in query.lower() or "auth" in query.lower():
+        if _FEATURE_RES["auth"].search(query_lower):
             imports.append("import hashlib")
             imports.append("import secrets")
         
-        if "todo" in query.lower() or "task" in query.lower():
+        if _FEATURE_RES["todo"].search(query_lower):
             imports.append("from datetime import datetime")
             imports.append("from typing import List, Dict, Optional")
         
@@ -802,14 +1532,14 @@ Make sure your response is:
             code_parts.append("def main():")
             code_parts.append('    """Main function implementing the requested functionality"""')
             
-            if "todo" in query.lower() or "task" in query.lower():
+            if _FEATURE_RES["todo"].search(query_lower):
                 code_parts.append("    # Todo list functionality")
                 code_parts.append("    todos = []")
                 code_parts.append("    print(\"Todo list application initialized\")")
-            elif "api" in query.lower():
+            elif _FEATURE_RES["api_only"].search(query_lower):
                 code_parts.append("    # API functionality")
                 code_parts.append("    print(\"API server would start here\")")
-            elif "database" in query.lower():
+            elif _FEATURE_RES["database_only"].search(query_lower):
                 code_parts.append("    # Database functionality")
                 code_parts.append("    print(\"Database operations would be performed here\")")
             else:
@@ -825,6 +1555,7 @@ Make sure your response is:
     def _generate_js_code(self, query: str, requirements: str, framework: Optional[str], ext: str) -> str:
         """Generate JavaScript/TypeScript code based on query requirements"""
         code_parts = []
+        query_lower = query.lower()
         
         if ext == "ts":
             code_parts.append("// Generated by SimpleAgent")
@@ -846,7 +1577,7 @@ Make sure your response is:
             code_parts.append("  );")
             code_parts.append("}\n")
             code_parts.append("export default App;")
-        elif framework == "express" or "api" in query.lower():
+        elif framework == "express" or _FEATURE_RES["api_only"].search(query_lower):
             code_parts.append("const express = require('express');")
             code_parts.append("const app = express();\n")
             code_parts.append("app.use(express.json());\n")
@@ -878,10 +1609,11 @@ Make sure your response is:
             elif framework == "flask":
                 deps.append("flask==3.0.0")
             
-            if "database" in requirements.lower() or "sql" in requirements.lower():
+            requirements_lower = requirements.lower()
+            if _FEATURE_RES["sql_dependency"].search(requirements_lower):
                 deps.append("sqlalchemy==2.0.23")
             
-            if "csv" in requirements.lower() or "data" in requirements.lower():
+            if _FEATURE_RES["data"].search(requirements_lower):
                 deps.append("pandas==2.1.3")
             
             if not deps:
@@ -893,258 +1625,31 @@ Make sure your response is:
         """Generate package.json for Node.js projects"""
         deps = {}
         
-        if framework == "express" or "api" in requirements.lower():
+        if framework == "express" or _FEATURE_RES["api_only"].search(requirements.lower()):
             deps["express"] = "^4.18.2"
         
         if framework == "react":
             deps["react"] = "^18.2.0"
             deps["react-dom"] = "^18.2.0"
         
-        deps_str = ",\n    ".join([f'"{k}": "{v}"' for k, v in deps.items()])
-        
-        return f"""{{
-  "name": "generated-project",
-  "version": "1.0.0",
-  "description": "Generated by SimpleAgent",
-  "main": "main.js",
-  "scripts": {{
-    "start": "node main.js"
-  }},
-  "dependencies": {{
-    {deps_str if deps_str else '// Add dependencies here'}
-  }}
-}}"""
+        package = {
+            "name": "generated-project",
+            "version": "1.0.0",
+            "description": "Generated by SimpleAgent",
+            "main": "main.js",
+            "scripts": {
+                "start": "node main.js"
+            },
+            "dependencies": deps
+        }
+        return json.dumps(package, indent=2)
     
     def _generate_comprehensive_readme(self, files: Dict[str, str], language: str, framework: Optional[str], analysis: Dict[str, Any]) -> str:
         """Generate a comprehensive README based on generated files"""
-        # Detect main entry point
-        main_file = None
-        for filename in files.keys():
-            if filename.endswith('main.py') or filename.endswith('main.js') or filename.endswith('main.ts') or filename == 'app.py' or filename == 'index.js':
-                main_file = filename
-                break
-        
-        if not main_file:
-            # Try to find any Python/JS file
-            for filename in files.keys():
-                if filename.endswith('.py') or filename.endswith('.js') or filename.endswith('.ts'):
-                    main_file = filename
-                    break
-        
-        # Detect if it's a web app
-        is_web_app = any('app' in f.lower() or 'server' in f.lower() or 'api' in f.lower() 
-                         for f in files.keys()) or framework in ['fastapi', 'flask', 'express', 'react']
-        
-        # Detect dependencies file
-        has_requirements = 'requirements.txt' in files
-        has_package_json = 'package.json' in files
-        
-        readme = f"""# Generated Project
-
-## Description
-This project was generated by SimpleAgent. Please review the code and customize as needed.
-
-## Technology Stack
-- Language: {language}
-{f"- Framework: {framework}" if framework else ""}
-
-## Prerequisites
-"""
-        
-        if language == "python":
-            readme += """- Python 3.8 or higher
-- pip (Python package manager)
-"""
-            if framework:
-                readme += f"- {framework} framework\n"
-        elif language in ["javascript", "typescript"]:
-            readme += """- Node.js 14.x or higher
-- npm (Node Package Manager)
-"""
-            if framework:
-                readme += f"- {framework} framework\n"
-        
-        readme += "\n## Installation\n\n"
-        
-        if language == "python":
-            readme += """1. Create a virtual environment (recommended):
-   ```bash
-   python -m venv venv
-   
-   # On Windows:
-   venv\\Scripts\\activate
-   
-   # On macOS/Linux:
-   source venv/bin/activate
-   ```
-
-2. Install dependencies:
-   ```bash
-   pip install -r requirements.txt
-   ```
-"""
-        elif language in ["javascript", "typescript"]:
-            readme += """1. Install dependencies:
-   ```bash
-   npm install
-   ```
-"""
-        
-        readme += "\n## How to Run\n\n"
-        
-        if is_web_app:
-            if framework == "fastapi":
-                readme += """Run the FastAPI application:
-   ```bash
-   uvicorn main:app --reload
-   ```
-   
-   Or if using app.py:
-   ```bash
-   uvicorn app:app --reload
-   ```
-   
-   The application will be available at: http://localhost:8000
-"""
-            elif framework == "flask":
-                readme += f"""Run the Flask application:
-   ```bash
-   python {main_file or 'app.py'}
-   ```
-   
-   The application will be available at: http://localhost:5000
-"""
-            elif framework == "express":
-                readme += """Run the Express server:
-   ```bash
-   npm start
-   ```
-   
-   Or:
-   ```bash
-   node main.js
-   ```
-   
-   The server will be available at: http://localhost:3000
-"""
-            else:
-                if main_file:
-                    if language == "python":
-                        readme += f"""Run the application:
-   ```bash
-   python {main_file}
-   ```
-"""
-                    else:
-                        readme += f"""Run the application:
-   ```bash
-   node {main_file}
-   ```
-"""
-        else:
-            if main_file:
-                if language == "python":
-                    readme += f"""Run the script:
-   ```bash
-   python {main_file}
-   ```
-"""
-                else:
-                    readme += f"""Run the script:
-   ```bash
-   node {main_file}
-   ```
-"""
-            else:
-                readme += f"""Run the main file:
-   ```bash
-   python main.py
-   ```
-   (Adjust the command based on your main entry point)
-"""
-        
-        readme += "\n## Project Structure\n\n"
-        readme += "Key files in this project:\n\n"
-        for filename in sorted(files.keys())[:10]:  # Show first 10 files
-            readme += f"- `{filename}`\n"
-        
-        readme += "\n## Usage\n\n"
-        readme += "Please refer to the code comments and implementation for usage details.\n"
-        
-        readme += "\n## Notes\n\n"
-        readme += "- This code was automatically generated. Please review and test before production use.\n"
-        readme += "- Make sure all dependencies are installed before running.\n"
-        if not has_requirements and not has_package_json:
-            readme += "- **Important**: Dependencies file may be missing. Please check and add required packages.\n"
-        
-        return readme
+        # Only the file names (in generation order) affect the README, so they form the cache key
+        return _render_comprehensive_readme(tuple(files), language, framework)
     
     def _generate_readme(self, query: str, requirements: str, language: str, framework: Optional[str]) -> str:
         """Generate comprehensive README"""
-        readme = f"""# Generated Project
-
-## Description
-This project was generated by SimpleAgent based on the following request:
-
-{query}
-
-## Requirements Identified
-{requirements}
-
-## Technology Stack
-- Language: {language}
-{f"- Framework: {framework}" if framework else ""}
-
-## Setup Instructions
-
-### Prerequisites
-- {language.capitalize()} installed
-{f"- {framework} framework" if framework else ""}
-
-### Installation
-"""
-        
-        if language == "python":
-            readme += """1. Create a virtual environment (recommended):
-   ```bash
-   python -m venv venv
-   source venv/bin/activate  # On Windows: venv\\Scripts\\activate
-   ```
-
-2. Install dependencies:
-   ```bash
-   pip install -r requirements.txt
-   ```
-
-3. Run the application:
-   ```bash
-   python main.py
-   ```
-"""
-        elif language in ["javascript", "typescript"]:
-            readme += """1. Install dependencies:
-   ```bash
-   npm install
-   ```
-
-2. Run the application:
-   ```bash
-   npm start
-   # or
-   node main.js
-   ```
-"""
-        
-        readme += f"""
-## Implementation Notes
-This code was generated based on your query. Please review and customize as needed to fully implement all requirements.
-
-## Next Steps
-1. Review the generated code
-2. Implement any missing functionality
-3. Add tests
-4. Customize based on your specific needs
-"""
-        
-        return readme
+        return _render_readme(query, requirements, language, framework)
 
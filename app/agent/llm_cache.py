@@ -0,0 +1,105 @@
+"""
+LLM response cache
+Stores parsed provider responses keyed by a hash of the request payload
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Protocol, Tuple
+
+try:
+    import orjson
+except ImportError:  # Optional: faster (de)serialization for the Redis backend
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(Protocol):
+    """Storage interface used by LLMCache"""
+
+    async def get(self, key: str) -> Optional[Any]:
+        ...
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        ...
+
+
+class MemoryBackend:
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    async def get(self, key: str) -> Optional[Any]:
+        async with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        async with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class RedisBackend:
+    """Redis-backed cache shared between workers (requires the redis package)"""
+
+    def __init__(self, url: str, prefix: str = "simpleagent:llm:"):
+        from redis import asyncio as aioredis
+        self._redis = aioredis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._redis.get(self.prefix + key)
+        if raw is None:
+            return None
+        return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        data = orjson.dumps(value) if orjson is not None else json.dumps(value)
+        await self._redis.set(self.prefix + key, data, ex=ttl)
+
+
+class LLMCache:
+    """Async cache front-end; backend errors are treated as misses"""
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend or MemoryBackend()
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            return await self.backend.get(key)
+        except Exception as e:
+            logger.warning("LLM cache read error: %s", e)
+            return None
+
+    async def set(self, key: str, value: Any, ttl: int = 3600) -> None:
+        try:
+            await self.backend.set(key, value, ttl)
+        except Exception as e:
+            logger.warning("LLM cache write error: %s", e)
+
+
+def create_cache(max_size: int = 256, redis_url: Optional[str] = None) -> LLMCache:
+    """Build an LLMCache, using Redis when a URL is configured"""
+    if redis_url:
+        try:
+            return LLMCache(RedisBackend(redis_url))
+        except ImportError:
+            logger.warning("redis package not installed, using in-memory LLM cache")
+    return LLMCache(MemoryBackend(max_size))
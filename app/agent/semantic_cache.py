@@ -0,0 +1,108 @@
+"""
+Semantic response cache
+Reuses generated codebases for queries that are paraphrases of earlier ones
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache over query embeddings.
+    Entries are tagged with the (language, framework) they were generated for; a lookup
+    only matches entries of the same stack, since the query text alone may not name one.
+    Requires the sentence-transformers and hnswlib packages.
+    """
+
+    def __init__(self, model_name: str, threshold: float = 0.92, ttl: int = 3600, max_entries: int = 1000):
+        from sentence_transformers import SentenceTransformer
+        import hnswlib
+
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._model = SentenceTransformer(model_name)
+        self._index = hnswlib.Index(space="cosine", dim=self._model.get_sentence_embedding_dimension())
+        self._index.init_index(max_elements=max_entries, ef_construction=200, M=16, allow_replace_deleted=True)
+        # label -> (expires_at, (language, framework), value), oldest first
+        self._entries: Dict[int, Tuple[float, Tuple[Optional[str], Optional[str]], Any]] = {}
+        self._next_label = 0
+        self._lock = asyncio.Lock()
+        # Room for the query's word pieces once the model's [CLS]/[SEP] tokens are added
+        self._max_query_tokens = self._model.max_seq_length - 2
+
+    def _encode(self, query: str):
+        """
+        Embed a query, or return None if it is longer than the model's input window.
+        The model would silently truncate it, so queries differing only past the cut-off
+        would share an embedding and be served each other's results.
+        """
+        # Every whitespace-separated word is at least one word piece; skip tokenizing long texts
+        if len(query.split()) > self._max_query_tokens:
+            return None
+        if len(self._model.tokenizer.tokenize(query)) > self._max_query_tokens:
+            return None
+        return self._model.encode(query, normalize_embeddings=True)
+
+    async def get(self, query: str, language: Optional[str], framework: Optional[str]) -> Optional[Any]:
+        """Return the value stored for the most similar earlier query on the same stack, if it is similar enough"""
+        if not self._entries:
+            return None
+        embedding = await asyncio.to_thread(self._encode, query)
+        if embedding is None:
+            return None
+
+        stack = (language, framework)
+        async with self._lock:
+            try:
+                labels, distances = self._index.knn_query(
+                    embedding, k=1, filter=lambda label: label in self._entries and self._entries[label][1] == stack
+                )
+            except RuntimeError:
+                # No live entry for this stack
+                return None
+            label = int(labels[0][0])
+            similarity = 1.0 - float(distances[0][0])
+            entry = self._entries.get(label)
+            if entry is None or similarity < self.threshold:
+                return None
+
+            expires_at, _, value = entry
+            if expires_at < time.monotonic():
+                self._index.mark_deleted(label)
+                del self._entries[label]
+                return None
+
+        logger.info("Semantic cache hit (similarity %.3f)", similarity)
+        return value
+
+    async def set(self, query: str, value: Any, language: Optional[str], framework: Optional[str]) -> None:
+        embedding = await asyncio.to_thread(self._encode, query)
+        if embedding is None:
+            return
+
+        async with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Evict the oldest entry; its slot is reused by the insert below
+                oldest = next(iter(self._entries))
+                self._index.mark_deleted(oldest)
+                del self._entries[oldest]
+
+            label = self._next_label
+            self._next_label += 1
+            self._index.add_items([embedding], [label], replace_deleted=True)
+            self._entries[label] = (time.monotonic() + self.ttl, (language, framework), value)
+
+
+def create_semantic_cache(model_name: str, threshold: float, ttl: int, max_entries: int) -> Optional[SemanticCache]:
+    """Build a SemanticCache, or return None when its optional dependencies are missing"""
+    try:
+        return SemanticCache(model_name, threshold, ttl, max_entries)
+    except ImportError as e:
+        logger.warning("Semantic cache disabled: %s (install sentence-transformers and hnswlib)", e)
+        return None
@@ -21,11 +21,51 @@ class Settings(BaseSettings):
     # Output settings
     OUTPUT_DIR: str = "outputs"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    ZIP_COMPRESS_LEVEL: int = 1  # zlib level for codebase zips; fast beats small for one-off downloads
+    ZIP_STORED_THRESHOLD: int = 64 * 1024  # codebases smaller than this (bytes) are zipped uncompressed
+    
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    
+    # Development mode: re-read the UI from disk on every request
+    DEBUG: bool = False
     
     # Agent settings
     ENABLE_CODE_GENERATION: bool = True
     CODE_GENERATION_THRESHOLD: float = 0.3 # Confidence threshold for code generation
     
+    # LLM response cache (only used for deterministic, low-temperature calls)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL: int = 3600  # seconds
+    LLM_CACHE_MAX_SIZE: int = 256  # entries kept by the in-memory backend
+    LLM_CACHE_REDIS_URL: Optional[str] = None  # e.g. redis://localhost:6379/0
+    
+    # Semantic cache: reuse codebases for paraphrased queries
+    # (requires the sentence-transformers and hnswlib packages)
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_MODEL: str = "all-MiniLM-L6-v2"
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92  # minimum cosine similarity for a hit
+    SEMANTIC_CACHE_TTL: int = 3600  # seconds
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1000
+    
+    # Provider fallback: skip a provider after this many consecutive transient failures
+    CIRCUIT_BREAKER_THRESHOLD: int = 3
+    CIRCUIT_BREAKER_COOLDOWN: int = 60  # seconds before a failing provider is retried
+    # Race the top two healthy providers for codebase generation (lower latency, higher token spend)
+    RACE_PROVIDERS: bool = False
+    
+    # Timeout (seconds) for provider HTTP requests; long code generations can take minutes
+    LLM_HTTP_TIMEOUT: float = 120.0
+    
+    # Provider throttling: max in-flight requests, and optional requests-per-minute caps
+    # (RPM caps require the aiolimiter package)
+    OPENAI_MAX_CONCURRENCY: int = 10
+    ANTHROPIC_MAX_CONCURRENCY: int = 5
+    GEMINI_MAX_CONCURRENCY: int = 5
+    OPENAI_REQUESTS_PER_MINUTE: Optional[int] = None
+    ANTHROPIC_REQUESTS_PER_MINUTE: Optional[int] = None
+    GEMINI_REQUESTS_PER_MINUTE: Optional[int] = None
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -3,21 +3,29 @@ SimpleAgent - Main FastAPI Application
 Handles HTTP requests, file uploads, and query processing
 """
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Depends, Request
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
+import json
+import logging
+import mimetypes
 import os
 import zipfile
 import shutil
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Optional
 
 from app.agent.agent import SimpleAgent
 from app.utils.file_processor import FileProcessor
 from app.utils.output_manager import OutputManager
 from app.config import settings
 
+logging.basicConfig(
+    level=settings.LOG_LEVEL,
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+
 app = FastAPI(title="SimpleAgent", version="1.0.0")
 
 # CORS middleware
@@ -39,77 +47,156 @@ output_dir = Path("outputs")
 output_dir.mkdir(exist_ok=True)
 
 
+@app.on_event("startup")
+async def create_services():
+    """
+    Build the shared agent, file processor and output manager once, on the event loop.
+    The agent holds provider clients, pools, caches and rate limiters that every request reuses.
+    """
+    app.state.agent = SimpleAgent()
+    app.state.file_processor = FileProcessor()
+    app.state.output_manager = OutputManager()
+
+
+@app.on_event("shutdown")
+async def close_agent():
+    """Release the agent's pooled HTTP connections"""
+    await app.state.agent.aclose()
+
+
+# Async dependencies run on the event loop rather than in the threadpool
+async def get_agent(request: Request) -> SimpleAgent:
+    return request.app.state.agent
+
+
+async def get_file_processor(request: Request) -> FileProcessor:
+    return request.app.state.file_processor
+
+
+async def get_output_manager(request: Request) -> OutputManager:
+    return request.app.state.output_manager
+
+
+def _load_index_html() -> bytes:
+    """Read the main UI page as raw UTF-8, or a placeholder if the frontend is missing"""
+    try:
+        return Path("app/static/index.html").read_bytes()
+    except FileNotFoundError:
+        return b"<h1>SimpleAgent</h1><p>Please create the frontend files.</p>"
+
+
+# Loaded once at startup; in DEBUG mode it is re-read per request so frontend edits show up
+_INDEX_HTML = _load_index_html()
+
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
     """Serve the main UI"""
-    html_file = Path("app/static/index.html")
-    if html_file.exists():
-        with open(html_file, "r", encoding="utf-8") as f:
-            return HTMLResponse(content=f.read())
-    return HTMLResponse(content="<h1>SimpleAgent</h1><p>Please create the frontend files.</p>")
+    return HTMLResponse(content=_load_index_html() if settings.DEBUG else _INDEX_HTML)
 
 
 @app.post("/api/query")
 async def process_query(
     query: str = Form(...),
-    file: Optional[UploadFile] = File(None)
+    file: Optional[UploadFile] = File(None),
+    agent: SimpleAgent = Depends(get_agent),
+    file_processor: FileProcessor = Depends(get_file_processor),
+    output_manager: OutputManager = Depends(get_output_manager)
 ):
     """
     Process user query and generate output (codebase or text file)
     """
     try:
-        # Initialize agent
-        agent = SimpleAgent()
-        
-        # Process uploaded file if provided
-        file_content = None
-        if file and file.filename:
-            file_processor = FileProcessor()
-            file_content = await file_processor.process_uploaded_file(file)
-        
-        # Combine query with file content if available
-        full_query = query
-        if file_content:
-            full_query = f"{query}\n\nAdditional context from uploaded file:\n{file_content}"
+        full_query = await _build_full_query(query, file, file_processor)
         
         # Process query with agent
-        result = await agent.process_query(full_query)
+        result = await agent.process_query(full_query, has_upload=full_query != query)
         
         # Generate output
-        output_manager = OutputManager()
         output_path = await output_manager.generate_output(result, query)
         
-        return JSONResponse({
-            "success": True,
-            "message": "Query processed successfully",
-            "output_type": result["type"],
-            "output_path": str(output_path),
-            "download_url": f"/api/download/{output_path.name}"
-        })
+        return JSONResponse(_output_summary(result, output_path))
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
 
+@app.post("/api/query/stream")
+async def stream_query(
+    query: str = Form(...),
+    file: Optional[UploadFile] = File(None),
+    agent: SimpleAgent = Depends(get_agent),
+    file_processor: FileProcessor = Depends(get_file_processor),
+    output_manager: OutputManager = Depends(get_output_manager)
+):
+    """
+    Like /api/query, but streams server-sent events: a 'file' event as each generated file
+    completes, a 'reset' event if those files are superseded, then a 'done' event with the
+    /api/query response body (or an 'error' event)
+    """
+    try:
+        full_query = await _build_full_query(query, file, file_processor)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
+    
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in agent.stream_query(full_query, has_upload=full_query != query):
+                if event["type"] == "file":
+                    yield _sse("file", {"path": event["path"], "content": event["content"]})
+                elif event["type"] == "reset":
+                    yield _sse("reset", {})
+                else:
+                    result = event["result"]
+                    output_path = await output_manager.generate_output(result, query)
+                    yield _sse("done", _output_summary(result, output_path))
+        except Exception as e:
+            yield _sse("error", {"detail": f"Error processing query: {str(e)}"})
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+async def _build_full_query(query: str, file: Optional[UploadFile], file_processor: FileProcessor) -> str:
+    """Combine the query with the uploaded file's text, if a file was provided"""
+    if file and file.filename:
+        file_content = await file_processor.process_uploaded_file(file)
+        if file_content:
+            return f"{query}\n\nAdditional context from uploaded file:\n{file_content}"
+    return query
+
+
+def _output_summary(result: Dict[str, Any], output_path: Path) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "message": "Query processed successfully",
+        "output_type": result["type"],
+        "output_path": str(output_path),
+        "download_url": f"/api/download/{output_path.name}"
+    }
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event; JSON keeps multi-line content on a single data line"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
 @app.get("/api/download/{filename}")
 async def download_output(filename: str):
     """Download generated output file"""
     output_path = output_dir / filename
-    if not output_path.exists():
+    try:
+        # Reuse this stat for the response headers instead of a second one inside FileResponse
+        stat_result = output_path.stat()
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
     
-    if filename.endswith(".zip"):
-        return FileResponse(
-            path=str(output_path),
-            filename=filename,
-            media_type="application/zip"
-        )
-    else:
-        return FileResponse(
-            path=str(output_path),
-            filename=filename,
-            media_type="text/plain"
-        )
+    media_type, _ = mimetypes.guess_type(filename)
+    return FileResponse(
+        path=str(output_path),
+        filename=filename,
+        media_type=media_type or "application/octet-stream",
+        stat_result=stat_result
+    )
 
 
 @app.get("/api/query-templates")
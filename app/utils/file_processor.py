@@ -4,9 +4,13 @@ File processing utilities for handling uploaded files
 
 from fastapi import UploadFile, HTTPException
 from pathlib import Path
-import PyPDF2
-import io
-from typing import Optional
+import codecs
+import importlib.util
+import os
+from typing import BinaryIO, Optional
+
+# PDFium (via pypdfium2) extracts text far faster than pure-Python pypdf; use it when installed
+_HAS_PDFIUM = importlib.util.find_spec("pypdfium2") is not None
 
 
 class FileProcessor:
@@ -14,7 +18,15 @@ class FileProcessor:
     
     def __init__(self):
         self.max_file_size = 10 * 1024 * 1024  # 10MB
-        self.supported_extensions = {'.pdf', '.txt', '.md', '.docx'}
+        self.chunk_size = 1024 * 1024  # Text uploads are decoded 1MB at a time
+        # Text extractor for each supported file extension
+        self._dispatch = {
+            '.pdf': self._extract_from_pdf,
+            '.txt': self._decode_text,
+            '.md': self._decode_text,
+            '.docx': self._extract_from_docx
+        }
+        self.supported_extensions = self._dispatch.keys()
     
     async def process_uploaded_file(self, file: UploadFile) -> str:
         """
@@ -26,55 +38,79 @@ class FileProcessor:
         Returns:
             Extracted text content as string
         """
-        # Check file size
-        content = await file.read()
-        if len(content) > self.max_file_size:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File size exceeds maximum allowed size of {self.max_file_size / 1024 / 1024}MB"
-            )
-        
         # Check file extension
         file_extension = Path(file.filename).suffix.lower()
-        if file_extension not in self.supported_extensions:
+        handler = self._dispatch.get(file_extension)
+        if handler is None:
             raise HTTPException(
                 status_code=400,
                 detail=f"Unsupported file type. Supported types: {', '.join(self.supported_extensions)}"
             )
         
-        # Extract text based on file type
-        if file_extension == '.pdf':
-            return self._extract_from_pdf(content)
-        elif file_extension == '.txt' or file_extension == '.md':
-            return content.decode('utf-8')
-        elif file_extension == '.docx':
-            return self._extract_from_docx(content)
-        else:
-            raise HTTPException(status_code=400, detail="Unable to process file type")
+        # Starlette has already spooled the upload, so check its size without reading it again
+        content = file.file
+        file_size = file.size
+        if file_size is None:
+            file_size = content.seek(0, os.SEEK_END)
+        if file_size > self.max_file_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File size exceeds maximum allowed size of {self.max_file_size / 1024 / 1024}MB"
+            )
+        content.seek(0)
+        
+        # Extract text based on file type, straight from the spooled upload
+        return handler(content)
+    
+    def _decode_text(self, content: BinaryIO) -> str:
+        """Decode a UTF-8 text file chunk by chunk"""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        text_parts = []
+        while chunk := content.read(self.chunk_size):
+            text_parts.append(decoder.decode(chunk))
+        text_parts.append(decoder.decode(b'', final=True))
+        return ''.join(text_parts)
     
-    def _extract_from_pdf(self, content: bytes) -> str:
+    def _extract_from_pdf(self, content: BinaryIO) -> str:
         """Extract text from PDF file"""
         try:
-            pdf_file = io.BytesIO(content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            if _HAS_PDFIUM:
+                return self._extract_with_pdfium(content)
             
-            text_content = []
-            for page in pdf_reader.pages:
-                text_content.append(page.extract_text())
+            import pypdf
+            pdf_reader = pypdf.PdfReader(content, strict=False)
             
-            return '\n'.join(text_content)
+            # Pages without a text layer (e.g. scans) are skipped
+            return '\n'.join(text for page in pdf_reader.pages if (text := page.extract_text()))
         except Exception as e:
             raise HTTPException(
                 status_code=400,
                 detail=f"Error extracting text from PDF: {str(e)}"
             )
     
-    def _extract_from_docx(self, content: bytes) -> str:
+    def _extract_with_pdfium(self, content: BinaryIO) -> str:
+        """Extract PDF text with PDFium; pages are read sequentially since PDFium is not thread-safe"""
+        import pypdfium2 as pdfium
+        
+        # pypdfium2 only accepts streams with readinto(), which SpooledTemporaryFile lacks before
+        # Python 3.11; uploads are capped at max_file_size, so hand it the bytes instead
+        pdf = pdfium.PdfDocument(content.read())
+        try:
+            text_content = []
+            for page in pdf:
+                # PDFium separates lines with \r\n; normalize to match the other extractors
+                text = page.get_textpage().get_text_range().replace('\r\n', '\n')
+                if text:
+                    text_content.append(text)
+            return '\n'.join(text_content)
+        finally:
+            pdf.close()
+    
+    def _extract_from_docx(self, content: BinaryIO) -> str:
         """Extract text from DOCX file"""
         try:
             from docx import Document
-            docx_file = io.BytesIO(content)
-            doc = Document(docx_file)
+            doc = Document(content)
             
             text_content = []
             for paragraph in doc.paragraphs:
@@ -3,11 +3,12 @@ Output management utilities for generating codebases and text files
 """
 
 from pathlib import Path
+import asyncio
 import zipfile
-import shutil
 from datetime import datetime
 from typing import Dict, Any
 import os
+from app.config import settings
 
 
 class OutputManager:
@@ -37,44 +38,42 @@ class OutputManager:
     
     async def _generate_codebase_zip(self, result: Dict[str, Any], query: str, timestamp: str) -> Path:
         """Generate a zip file containing the codebase"""
-        # Create temporary directory for codebase
-        temp_dir = self.output_dir / f"codebase_{timestamp}"
-        temp_dir.mkdir(exist_ok=True)
+        # Compression and file I/O run in a worker thread so the event loop keeps serving requests
+        return await asyncio.to_thread(self._sync_generate_codebase_zip, result, query, timestamp)
+    
+    def _sync_generate_codebase_zip(self, result: Dict[str, Any], query: str, timestamp: str) -> Path:
+        """Blocking implementation of _generate_codebase_zip"""
+        zip_filename = f"codebase_{timestamp}.zip"
+        zip_path = self.output_dir / zip_filename
         
         try:
             files = result["content"].get("files", {})
+            encoded = {file_path: content.encode("utf-8") for file_path, content in files.items()}
             
-            # Write all files to temporary directory
-            for file_path, content in files.items():
-                full_path = temp_dir / file_path
-                full_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                with open(full_path, "w", encoding="utf-8") as f:
-                    f.write(content)
-            
-            # Create zip file
-            zip_filename = f"codebase_{timestamp}.zip"
-            zip_path = self.output_dir / zip_filename
+            # Small codebases are not worth deflating; otherwise favour speed over ratio
+            if sum(map(len, encoded.values())) < settings.ZIP_STORED_THRESHOLD:
+                compression = zipfile.ZIP_STORED
+            else:
+                compression = zipfile.ZIP_DEFLATED
             
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file_path in temp_dir.rglob('*'):
-                    if file_path.is_file():
-                        arcname = file_path.relative_to(temp_dir)
-                        zipf.write(file_path, arcname)
-            
-            # Clean up temporary directory
-            shutil.rmtree(temp_dir)
+            # Files are already in memory, so write them straight into the archive
+            with zipfile.ZipFile(zip_path, 'w', compression, compresslevel=settings.ZIP_COMPRESS_LEVEL) as zipf:
+                for file_path, data in encoded.items():
+                    zipf.writestr(file_path, data)
             
             return zip_path
         
         except Exception as e:
             # Clean up on error
-            if temp_dir.exists():
-                shutil.rmtree(temp_dir)
+            zip_path.unlink(missing_ok=True)
             raise Exception(f"Error generating codebase: {str(e)}")
     
     async def _generate_text_file(self, result: Dict[str, Any], query: str, timestamp: str) -> Path:
         """Generate a text file with the response"""
+        return await asyncio.to_thread(self._sync_generate_text_file, result, query, timestamp)
+    
+    def _sync_generate_text_file(self, result: Dict[str, Any], query: str, timestamp: str) -> Path:
+        """Blocking implementation of _generate_text_file"""
         content = result.get("content", "")
         if isinstance(content, dict):
             content = content.get("content", str(content))
@@ -96,8 +95,8 @@ Metadata: {result.get('metadata', {})}
         filename = f"response_{timestamp}.txt"
         file_path = self.output_dir / filename
         
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(text_content)
+        # Encode once and write raw bytes, skipping the text-mode wrapper and newline translation
+        file_path.write_bytes(text_content.encode("utf-8"))
         
         return file_path
 
@@ -0,0 +1,58 @@
+import pytest
+
+from app.agent.agent import _CodebaseScanner
+
+
+OUTER_FENCE = (
+    "```\n"
+    "FILE: main.py\n"
+    "import utils\n"
+    "print(utils.helper())\n"
+    "FILE: utils.py\n"
+    "def helper():\n"
+    "    return 1\n"
+    "```\n"
+)
+
+README_WITH_BASH_BLOCK = (
+    "FILE: README.md\n"
+    "# My Project\n"
+    "\n"
+    "A small tool.\n"
+    "## Install\n"
+    "```bash\n"
+    "pip install -r requirements.txt\n"
+    "```\n"
+)
+
+
+def scan(text, chunk_size=None):
+    scanner = _CodebaseScanner()
+    step = chunk_size or len(text) or 1
+    for start in range(0, len(text), step):
+        scanner.feed(text[start:start + step])
+    scanner.finish()
+    return scanner.files
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 7])
+def test_outer_fence_keeps_last_file(chunk_size):
+    files = scan(OUTER_FENCE, chunk_size)
+    assert files == {
+        "main.py": "import utils\nprint(utils.helper())",
+        "utils.py": "def helper():\n    return 1",
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 7])
+def test_fence_inside_file_keeps_preceding_text(chunk_size):
+    files = scan(README_WITH_BASH_BLOCK, chunk_size)
+    assert files == {
+        "README.md": "# My Project\n\nA small tool.\n## Install\npip install -r requirements.txt",
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 7])
+def test_fence_right_after_marker_is_dropped(chunk_size):
+    files = scan("FILE: app.py\n\n```python\nprint('hi')\n```\n", chunk_size)
+    assert files == {"app.py": "print('hi')"}